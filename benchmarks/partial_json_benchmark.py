@@ -0,0 +1,85 @@
+"""Parse time and peak memory of `load_subtree` against `json.load`.
+
+Usage: python benchmarks/partial_json_benchmark.py [--slices 20000]
+"""
+
+import argparse
+import json
+import random
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from boa_guard.partial_json import load_subtree
+
+AGGREGATED = {"abdominal_cavity": {"min_slice_idx": 1, "max_slice_idx": 9}}
+
+
+def per_slice_dicts(slices: int) -> dict[str, Any]:
+    # Like the per-slice tissue sections, lots of small objects with string keys
+    return {
+        "slices": [
+            {
+                "index": i,
+                "region": "abdominal_cavity",
+                "tissues": {t: random.random() for t in ("bone", "muscle", "sat")},
+            }
+            for i in range(slices)
+        ],
+        "aggregated": AGGREGATED,
+    }
+
+
+def per_slice_numbers(slices: int) -> dict[str, Any]:
+    return {
+        "slices": [[random.random() for _ in range(20)] for _ in range(slices)],
+        "aggregated": AGGREGATED,
+    }
+
+
+def measure(func: Callable[[], Any]) -> tuple[float, float]:
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--slices", type=int, default=20000)
+    parser.add_argument("--indent", type=int)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, build in (
+            ("per-slice dicts", per_slice_dicts),
+            ("per-slice numbers", per_slice_numbers),
+        ):
+            path = Path(tmp) / "measurements.json"
+            path.write_text(json.dumps(build(args.slices), indent=args.indent))
+
+            def full(path: Path = path) -> Any:
+                with path.open(encoding="utf-8") as f:
+                    return json.load(f)["aggregated"]
+
+            def partial(path: Path = path) -> Any:
+                return load_subtree(path, "aggregated")
+
+            size = path.stat().st_size / 1e6
+            for label, func in (("json.load", full), ("load_subtree", partial)):
+                elapsed, peak = measure(func)
+                print(
+                    f"{name:<18} {size:>6.1f} MB | {label:<12} | "
+                    f"{elapsed:>6.3f} s | peak {peak / 1e6:>7.1f} MB"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Throughput/latency benchmark of `push.post_data` against the stand-in server.
+
+Usage: python benchmarks/push_benchmark.py [--sizes 10 100 1000] [--latency 0.05]
+"""
+
+import argparse
+import json
+import random
+import statistics
+import time
+from typing import Any
+
+import requests
+
+from boa_guard.bundles import to_fhir_bundles
+from boa_guard.mapping_dict import mapping_dict
+from boa_guard.push import post_data
+from boa_guard.stub_server import StubConfig, serve
+from boa_guard.tx import create_transactions
+from boa_guard.utils import FHIRServer
+
+
+def synthetic_study(index: int) -> list[dict[str, Any]]:
+    tissues = {t: {"sum": random.uniform(0, 5000)} for t in mapping_dict["tissues"]}
+    bca_dict = {
+        k: {
+            "min_slice_idx": 10,
+            "max_slice_idx": 200,
+            "measurements": tissues,
+            "measurements_no_extremities": tissues,
+        }
+        for k in mapping_dict["bca"]
+    }
+    total_dict = {
+        k.replace("-", "_"): {"present": True, "volume_ml": random.uniform(1, 2000)}
+        for k in mapping_dict["total"]
+    }
+    dicom_dict: dict[str, Any] = {
+        "StudyInstanceUID": f"1.2.826.0.1.{index}",
+        "SeriesInstanceUID": f"1.2.826.0.1.{index}.1",
+        "PatientID": f"BENCH{index:06d}",
+        "SeriesNumber": "1",
+        "Modality": "CT",
+        "SeriesDescription": "Abdomen",
+        "AccessionNumber": f"ACC{index:06d}",
+        "ImageID": f"{index:064x}",
+        "Started": "2024-01-02T10:11:12+01:00",
+        "Effective": "2024-01-02T10:15:00+01:00",
+        "NumberOfInstances": 400,
+    }
+    info_dict = {
+        "BOAVersion": "1.0.0",
+        "BOAGitHash": "0123456789abcdef",
+        "PredictedContrastPhase": "PORTAL_VENOUS",
+        "PredictedContrastInGIT": "NO",
+        "reports": [],
+    }
+    return to_fhir_bundles(bca_dict, total_dict, dicom_dict, info_dict)
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(q * (len(ordered) - 1)))]
+
+
+def run(size: int, repeats: int, config: StubConfig, timeout: float) -> None:
+    bundle_dict: list[dict[str, Any]] = []
+    for i in range(size):
+        bundle_dict.extend(synthetic_study(i))
+    data = json.dumps(create_transactions(bundle_dict)).encode("utf-8")
+    num_resources = len(bundle_dict)
+
+    latencies: list[float] = []
+    errors = 0
+    with serve(config) as server:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            try:
+                post_data(FHIRServer(server.url, "bench", "bench", timeout), data, None)
+            except requests.RequestException:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+        stats = server.stats
+
+    elapsed = sum(latencies)
+    print(
+        f"{size:>6} studies | {num_resources:>7} resources | "
+        f"{num_resources * (repeats - errors) / elapsed:>9.1f} resources/s | "
+        f"p50 {statistics.median(latencies) * 1e3:>8.1f} ms | "
+        f"p99 {percentile(latencies, 0.99) * 1e3:>8.1f} ms | "
+        f"sent {stats.bytes_received / repeats / 1e6:>7.2f} MB/push | "
+        f"received {stats.bytes_sent / repeats / 1e6:>6.2f} MB/push | "
+        f"errors {errors}/{repeats} {stats.status_codes}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--unavailable-rate", type=float, default=0.0)
+    parser.add_argument("--entry-failure-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = vars(parser.parse_args())
+    sizes, repeats, timeout = (
+        args.pop("sizes"),
+        args.pop("repeats"),
+        args.pop("timeout"),
+    )
+
+    random.seed(args["seed"])
+    for size in sizes:
+        run(size, repeats, StubConfig(**args), timeout)
+
+
+if __name__ == "__main__":
+    main()
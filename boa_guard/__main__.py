@@ -3,6 +3,8 @@ from importlib import import_module
 from pathlib import Path
 from typing import Any, Callable, cast
 
+from boa_guard.artifacts import COMPRESSIONS
+
 _COMMAND_MAP = {
     "bundles": ("boa_guard.bundles:main", "Generate FHIR bundles"),
     "tx": ("boa_guard.tx:main", "Create FHIR transactions"),
@@ -47,6 +49,112 @@ def _build_parser() -> argparse.ArgumentParser:
                 required=True,
                 help="Path to the BOA folder",
             )
+            sp.add_argument(
+                "--upload-attachments",
+                action="store_true",
+                help="Upload the PDF/xlsx/JSON reports as FHIR Binary resources",
+            )
+            sp.add_argument(
+                "--distributed",
+                action="store_true",
+                help="Share the BOA folder with other workers via a queue in the "
+                "FHIR folder, results are only written as study shards",
+            )
+            sp.add_argument(
+                "--worker-id",
+                help="Name of this worker in the queue (default: HOST-PID)",
+            )
+            sp.add_argument(
+                "--lease-seconds",
+                type=float,
+                default=300,
+                help="Time after which a claimed folder of an unresponsive "
+                "worker is handed out again",
+            )
+            sp.add_argument(
+                "--rescan",
+                action="store_true",
+                help="With --distributed, search the BOA folder again for "
+                "reports added after the queue's scan finished",
+            )
+            sp.add_argument(
+                "--requeue",
+                action="append",
+                choices=["failed", "done"],
+                default=[],
+                help="With --distributed, process the failed / done folders "
+                "of the queue again (repeatable)",
+            )
+            sp.add_argument(
+                "--skip-dir",
+                dest="skip_dirs",
+                action="append",
+                default=[],
+                help="Folder name not to descend into while searching the BOA "
+                "folder, in addition to dicoms (repeatable)",
+            )
+            sp.add_argument(
+                "--scan-workers",
+                type=int,
+                default=8,
+                help="Number of threads searching the BOA folder",
+            )
+            sp.add_argument(
+                "--timeout",
+                type=float,
+                default=300,
+                help="Seconds to wait for the FHIR server while uploading "
+                "attachments (default: 300)",
+            )
+            sp.add_argument(
+                "--shards-only",
+                action="store_true",
+                help="Only write the study shards, not fhir-bundles.json",
+            )
+        else:
+            for flag, dest, label in (
+                ("--patient-id", "patient_id", "PatientID"),
+                ("--study-uid", "study_uid", "StudyInstanceUID"),
+                ("--series-uid", "series_uid", "SeriesInstanceUID"),
+            ):
+                sp.add_argument(
+                    flag,
+                    dest=dest,
+                    action="append",
+                    help=f"Only use the studies with this {label} (repeatable)",
+                )
+        if name in {"bundles", "tx"}:
+            sp.add_argument(
+                "--compress",
+                choices=list(COMPRESSIONS),
+                help="Write the output compressed, zstd needs `boa-guard[zstd]`",
+            )
+        if name == "push":
+            sp.add_argument(
+                "--timeout",
+                type=float,
+                default=30,
+                help="Seconds to wait for the FHIR server (default: 30)",
+            )
+            sp.add_argument(
+                "--forward-compressed",
+                action="store_true",
+                help="Send gzip compressed transactions as they are "
+                "(Content-Encoding: gzip) instead of decompressing them",
+            )
+            sp.add_argument(
+                "--check-patients",
+                action="store_true",
+                help="Look up the referenced Patients on the server first and "
+                "hold back the studies of missing ones",
+            )
+            sp.add_argument(
+                "--patient-cache-ttl",
+                type=float,
+                default=86400,
+                help="Seconds a Patient found on the server is not looked up "
+                "again (default: 86400)",
+            )
         sp.set_defaults(func=_resolve_callable(target))
     return parser
 
@@ -0,0 +1,74 @@
+import json
+import logging
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import pydicom
+
+from boa_guard.bundles import dicom_dict_from_datasets, to_fhir_bundles
+from boa_guard.push import post_data
+from boa_guard.tx import create_transactions
+from boa_guard.utils import FHIRServer
+
+logger = logging.getLogger("boa-guard")
+
+INFO_KEYS = (
+    "BOAVersion",
+    "BOAGitHash",
+    "PredictedContrastPhase",
+    "PredictedContrastInGIT",
+)
+
+
+@dataclass
+class BOAResult:
+    # Either the full content of `bca-measurements.json` or its "aggregated" part
+    bca: dict[str, Any]
+    # Either the full content of `total-measurements.json` or its total segmentation
+    total: dict[str, Any]
+    # Either the output of `bundles.get_dicom_dict` or the DICOM datasets
+    dicom: dict[str, Any] | Sequence[pydicom.Dataset]
+    # BOAVersion, BOAGitHash, PredictedContrastPhase, PredictedContrastInGIT
+    info: dict[str, Any]
+
+
+def build_bundles(result: BOAResult) -> list[dict[str, Any]]:
+    bca_dict = result.bca.get("aggregated", result.bca)
+    total_dict = result.total.get("segmentations", {}).get("total", result.total)
+    if isinstance(result.dicom, dict):
+        dicom_dict = result.dicom
+    else:
+        dicom_dict = dicom_dict_from_datasets(result.dicom)
+    if not dicom_dict:
+        raise ValueError("Without DICOM metadata the FHIR bundles can't be generated.")
+    if missing := [k for k in INFO_KEYS if k not in result.info]:
+        raise ValueError(
+            f"Missing BOA info: {', '.join(missing)}. "
+            "Without it the FHIR bundles can't be generated."
+        )
+    info_dict = {"reports": [], **result.info}
+    return to_fhir_bundles(bca_dict, total_dict, dicom_dict, info_dict)
+
+
+def build_transaction(results: Iterable[BOAResult]) -> dict[str, Any]:
+    bundle_dict: list[dict[str, Any]] = []
+    for result in results:
+        bundle_dict.extend(build_bundles(result))
+    return create_transactions(bundle_dict)
+
+
+def transaction_bytes(results: Iterable[BOAResult]) -> bytes:
+    return json.dumps(build_transaction(results)).encode("utf-8")
+
+
+def push_results(
+    results: Iterable[BOAResult],
+    server: FHIRServer | None = None,
+    json_logs: Path | None = None,
+) -> dict[str, Any]:
+    # Fall back to the same env vars as `boa-guard push`
+    return post_data(
+        server or FHIRServer.from_env(), transaction_bytes(results), json_logs
+    )
@@ -0,0 +1,95 @@
+import gzip
+import io
+import json
+from collections.abc import Iterator
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from typing import IO, Any, cast
+
+COMPRESSIONS = {"gzip": ".gz", "zstd": ".zst"}
+_MAGIC = {b"\x1f\x8b": "gzip", b"\x28\xb5\x2f\xfd": "zstd"}
+
+
+def _zstandard() -> Any:
+    try:
+        import zstandard
+    except ImportError as e:
+        raise RuntimeError(
+            "zstd compressed artifacts need the `zstandard` package. "
+            "Install it with `pip install boa-guard[zstd]`."
+        ) from e
+    return zstandard
+
+
+def artifact_path(folder: Path, name: str, compression: str | None = None) -> Path:
+    return folder / f"{name}{COMPRESSIONS[compression] if compression else ''}"
+
+
+def find_artifact(folder: Path, name: str) -> Path | None:
+    # If several variants exist, the most recently written one wins
+    suffixes = ("", *COMPRESSIONS.values())
+    candidates = [folder / f"{name}{s}" for s in suffixes]
+    candidates = [p for p in candidates if p.is_file()]
+    return max(candidates, key=lambda p: p.stat().st_mtime, default=None)
+
+
+def _compression_of(head: bytes) -> str | None:
+    return next((c for m, c in _MAGIC.items() if head.startswith(m)), None)
+
+
+def detect_compression(path: Path) -> str | None:
+    with path.open("rb") as f:
+        return _compression_of(f.read(4))
+
+
+@contextmanager
+def open_artifact(path: Path, mode: str = "rb") -> Iterator[IO[bytes]]:
+    # Reading detects the compression from the content, writing from the suffix
+    if mode == "rb":
+        compression = detect_compression(path)
+    elif mode == "wb":
+        compression = next(
+            (c for c, s in COMPRESSIONS.items() if path.suffix == s), None
+        )
+    else:
+        raise ValueError(f"Unsupported mode '{mode}'")
+
+    with ExitStack() as stack:
+        f: IO[bytes] = stack.enter_context(path.open(mode))
+        if compression == "gzip":
+            gz = stack.enter_context(gzip.GzipFile(fileobj=f, mode=mode))
+            f = cast(IO[bytes], gz)
+        elif compression == "zstd":
+            zstd = _zstandard()
+            if mode == "rb":
+                f = stack.enter_context(zstd.ZstdDecompressor().stream_reader(f))
+            else:
+                f = stack.enter_context(zstd.ZstdCompressor().stream_writer(f))
+        yield f
+
+
+def read_json(path: Path) -> Any:
+    with open_artifact(path) as f:
+        return json.load(f)
+
+
+def loads(data: bytes) -> Any:
+    compression = _compression_of(data[:4])
+    if compression == "gzip":
+        data = gzip.decompress(data)
+    elif compression == "zstd":
+        data = _zstandard().ZstdDecompressor().decompressobj().decompress(data)
+    return json.loads(data)
+
+
+def write_json(path: Path, obj: Any) -> None:
+    compressed = path.suffix in COMPRESSIONS.values()
+    with open_artifact(path, "wb") as f:
+        text = io.TextIOWrapper(f, encoding="utf-8")
+        if compressed:
+            # Indentation only costs time once the file is compressed
+            json.dump(obj, text, separators=(",", ":"))
+        else:
+            json.dump(obj, text, indent=2)
+        text.flush()
+        text.detach()
@@ -0,0 +1,77 @@
+import logging
+from pathlib import Path
+from typing import Any
+
+import requests
+import requests.auth
+
+from boa_guard.utils import FHIRServer
+
+logger = logging.getLogger("boa-guard")
+
+
+def binary_url(sha1: str) -> str:
+    # Binaries are content-addressed, the sha1 hex digest is a valid FHIR id
+    return f"Binary/{sha1}"
+
+
+class BinaryUploader:
+    def __init__(self, server: FHIRServer) -> None:
+        self.server = server
+        self.base_url = server.url.rstrip("/")
+        self.session = requests.Session()
+        self.session.auth = requests.auth.HTTPBasicAuth(server.user, server.pwd)
+        self.head_allowed = True
+        self.uploaded = 0
+        self.skipped = 0
+
+    def exists(self, sha1: str) -> bool:
+        url = f"{self.base_url}/{binary_url(sha1)}"
+        if self.head_allowed:
+            resp = self.session.head(url, timeout=self.server.timeout)
+            if resp.status_code == 405:
+                logger.info("The server does not allow HEAD, checking with GET.")
+                self.head_allowed = False
+        if not self.head_allowed:
+            # Streaming only reads the status and headers, not the Binary
+            with self.session.get(
+                url, stream=True, timeout=self.server.timeout
+            ) as resp:
+                pass
+        if resp.status_code in {404, 410}:
+            return False
+        resp.raise_for_status()
+        return True
+
+    def upload(self, reports: list[dict[str, Any]]) -> None:
+        for report in reports:
+            if "path" not in report:
+                continue
+            if self.exists(report["hash"]):
+                report["url"] = binary_url(report["hash"])
+                self.skipped += 1
+                continue
+            path = Path(report["path"])
+            # Passing the file object streams it in chunks instead of loading it
+            with path.open("rb") as f:
+                resp = self.session.put(
+                    f"{self.base_url}/{binary_url(report['hash'])}",
+                    data=f,
+                    headers={
+                        "Content-Type": report["contentType"],
+                        "Content-Length": str(report["size"]),
+                    },
+                    timeout=self.server.timeout,
+                )
+            if not resp.ok:
+                logger.error(f"An error occured while uploading '{path}'.")
+                resp.raise_for_status()
+            report["url"] = binary_url(report["hash"])
+            self.uploaded += 1
+
+    def close(self) -> None:
+        logger.info(
+            f"Uploaded {self.uploaded} report attachment(s) to '{self.base_url}', "
+            f"{self.skipped} already present."
+        )
+        self.session.close()
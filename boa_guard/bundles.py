@@ -1,6 +1,9 @@
 import hashlib
-import json
 import logging
+import os
+import socket
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from dataclasses import dataclass, field
 from datetime import datetime, tzinfo
 from pathlib import Path
 from typing import Any
@@ -8,33 +11,146 @@ from typing import Any
 import pandas as pd
 import pydicom
 import pytz
+import requests
 
+from boa_guard import artifacts, store, workqueue
+from boa_guard.attachments import BinaryUploader
 from boa_guard.mapping_dict import mapping_dict
-from boa_guard.utils import generate_hash
+from boa_guard.partial_json import load_subtree
+from boa_guard.scanner import iter_excel_files
+from boa_guard.utils import FHIRServer, check_env_vars, file_sha1, generate_hash
 
 logger = logging.getLogger("boa-guard")
 
 
-def main(fhir_folder: Path, boa_folder: Path) -> None:
-    json_output = fhir_folder / "fhir-bundles.json"
+_FOLDER_ERRORS = (
+    FileNotFoundError,
+    NotADirectoryError,
+    requests.RequestException,
+    # Empty, truncated or incomplete measurement files
+    ValueError,
+    KeyError,
+)
+
+
+@dataclass
+class BundleOptions:
+    upload_attachments: bool = False
+    distributed: bool = False
+    worker_id: str | None = None
+    lease_seconds: float = 300
+    # States of finished folders to process again, see `workqueue.reset`
+    requeue: list[str] = field(default_factory=list)
+    rescan: bool = False
+    skip_dirs: list[str] = field(default_factory=list)
+    scan_workers: int = 8
+    compress: str | None = None
+    # Seconds to wait for the FHIR server while uploading attachments
+    timeout: float = 300
+    # Skip `fhir-bundles.json`, `tx` then reads the study shards
+    shards_only: bool = False
+
+
+def main(fhir_folder: Path, boa_folder: Path, **options: Any) -> None:
+    opts = BundleOptions(**options)
+    uploader = None
+    if opts.upload_attachments:
+        if not check_env_vars():
+            return
+        uploader = BinaryUploader(FHIRServer.from_env(opts.timeout))
+
+    if opts.distributed and opts.shards_only:
+        logger.warning(
+            "--distributed only writes study shards, --shards-only is ignored."
+        )
+    if not opts.distributed and (opts.rescan or opts.requeue):
+        logger.warning("--rescan and --requeue only apply with --distributed, ignored.")
+    fhir_folder.mkdir(exist_ok=True)
+
+    def scan() -> Iterator[Path]:
+        return iter_excel_files(boa_folder, opts.skip_dirs, opts.scan_workers)
+
+    if opts.distributed:
+        run_distributed(fhir_folder, scan, uploader, opts)
+    else:
+        run_local(fhir_folder, scan(), uploader, opts)
+    if uploader is not None:
+        uploader.close()
+
+
+def remove_bundles_file(fhir_folder: Path) -> None:
+    # Don't leave an outdated file behind that `tx` would prefer to the shards
+    for suffix in ("", *artifacts.COMPRESSIONS.values()):
+        (fhir_folder / f"fhir-bundles.json{suffix}").unlink(missing_ok=True)
+
+
+def run_local(
+    fhir_folder: Path,
+    excel_files: Iterable[Path],
+    uploader: BinaryUploader | None,
+    opts: BundleOptions,
+) -> None:
+    json_output = artifacts.artifact_path(
+        fhir_folder, "fhir-bundles.json", opts.compress
+    )
     result_dict: list[dict[str, Any]] = []
-    # Skip the lock/temp Excel files
-    for excel_file in boa_folder.rglob("[!~$]*.xlsx"):
+    study_bundles: list[list[dict[str, Any]]] = []
+    for excel_file in excel_files:
         try:
-            result_dict.extend(create_bundles(excel_file, excel_file.parent))
-        except (FileNotFoundError, NotADirectoryError) as e:
+            study_bundles.append(
+                create_bundles(excel_file, excel_file.parent, uploader)
+            )
+        except _FOLDER_ERRORS as e:
             logger.error(
                 "An Error occurred while processing the "
                 f"folder '{excel_file.parent}': {type(e).__name__}: {e}"
             )
 
-    fhir_folder.mkdir(exist_ok=True)
-    with json_output.open("w", encoding="utf-8") as f:
-        json.dump(result_dict, f, indent=2)
-    logger.info(f"Successfully created FHIR bundles in '{fhir_folder}'.")
+    if opts.shards_only:
+        remove_bundles_file(fhir_folder)
+    else:
+        for bundle in study_bundles:
+            result_dict.extend(bundle)
+        artifacts.write_json(json_output, result_dict)
+    num_shards = store.write_studies(fhir_folder, study_bundles, opts.compress)
+    logger.info(
+        f"Successfully created FHIR bundles in '{fhir_folder}' "
+        f"({num_shards} study shards)."
+    )
+
+
+def run_distributed(
+    fhir_folder: Path,
+    scan: Callable[[], Iterable[Path]],
+    uploader: BinaryUploader | None,
+    opts: BundleOptions,
+) -> None:
+    # The queue and the shards live in the shared FHIR folder, one worker
+    # scans the BOA folder while all of them claim folders from the queue
+    db = fhir_folder / workqueue.QUEUE_NAME
+    remove_bundles_file(fhir_folder)
+    if opts.rescan or opts.requeue:
+        requeued = workqueue.reset(db, opts.rescan, opts.requeue)
+        logger.info(f"Requeued {requeued} folder(s) in '{db}'.")
+
+    def process(excel_file: Path) -> str | None:
+        bundle = create_bundles(excel_file, excel_file.parent, uploader)
+        store.write_studies(fhir_folder, [bundle], opts.compress)
+        return None
+
+    workqueue.run_worker(
+        db,
+        opts.worker_id or f"{socket.gethostname()}-{os.getpid()}",
+        process,
+        scan,
+        opts.lease_seconds,
+    )
+    logger.info(f"Successfully created FHIR study shards in '{fhir_folder}'.")
 
 
-def create_bundles(excel_path: Path, folder: Path) -> list[dict[str, Any]]:
+def create_bundles(
+    excel_path: Path, folder: Path, uploader: BinaryUploader | None = None
+) -> list[dict[str, Any]]:
     json_bca = folder / "bca-measurements.json"
     json_total = folder / "total-measurements.json"
     dicom_path = folder / "dicoms"
@@ -50,12 +166,13 @@ def create_bundles(excel_path: Path, folder: Path) -> list[dict[str, Any]]:
             "Without the DICOM files the FHIR bundles can't be generated for this Patient."
         )
 
-    with json_bca.open(encoding="utf-8") as f:
-        bca_dict: dict[str, Any] = json.load(f)["aggregated"]
-    with json_total.open(encoding="utf-8") as f:
-        total_dict: dict[str, Any] = json.load(f)["segmentations"]["total"]
+    # Only parse the needed parts, the per-slice sections can be large
+    bca_dict: dict[str, Any] = load_subtree(json_bca, "aggregated")
+    total_dict: dict[str, Any] = load_subtree(json_total, "segmentations", "total")
     dicom_dict = get_dicom_dict(dicom_path)
     info_dict = get_info_dict(excel_path, json_bca, json_total)
+    if uploader is not None:
+        uploader.upload(info_dict["reports"])
     return to_fhir_bundles(bca_dict, total_dict, dicom_dict, info_dict)
 
 
@@ -112,8 +229,9 @@ def get_info_dict(excel_path: Path, json_bca: Path, json_total: Path) -> dict[st
         tmp_dict["contentType"] = f"application/{mapping_dict.get(suffix, suffix)}"
         tmp_dict["size"] = file.stat().st_size
         tmp_dict["title"] = name
+        tmp_dict["path"] = str(file)
         # Hash
-        tmp_dict["hash"] = hashlib.sha1(file.read_bytes()).hexdigest()
+        tmp_dict["hash"] = file_sha1(file)
         # Creation
         ts = getattr(file.stat(), "st_birthtime", file.stat().st_ctime)
         tmp_dict["creation"] = datetime.fromtimestamp(
@@ -127,6 +245,10 @@ def get_dicom_dict(dicom_path: Path) -> dict[str, str]:
     dicoms = [
         pydicom.dcmread(f, stop_before_pixels=True) for f in dicom_path.glob("*.dcm")
     ]
+    return dicom_dict_from_datasets(dicoms)
+
+
+def dicom_dict_from_datasets(dicoms: Sequence[pydicom.Dataset]) -> dict[str, str]:
     result: dict[str, Any] = {}
     if not dicoms:
         return result
@@ -301,13 +423,18 @@ def get_diagnostic_report(
                 "reference": f"ImagingStudy/{image_id}",
             },
             "presentedForm": [
+                # The url is only set for Binaries known to be on the server
                 {
-                    "contentType": i["contentType"],
-                    "url": "TODO",  # TODO
-                    "size": i["size"],
-                    "hash": i["hash"],
-                    "title": i["title"],
-                    "creation": i["creation"],
+                    key: i[key]
+                    for key in (
+                        "contentType",
+                        "url",
+                        "size",
+                        "hash",
+                        "title",
+                        "creation",
+                    )
+                    if key in i
                 }
                 for i in info_dict["reports"]
             ],
@@ -0,0 +1,116 @@
+import json
+import mmap
+import re
+from pathlib import Path
+from typing import Any
+
+# Skipped values are only scanned, no Python objects are built for them. The
+# patterns are "unrolled", a repetition step consumes a whole string and the
+# text after it, so the regex engine doesn't keep state per character.
+_OTHER = rb'[^"\[\]{}]*'
+_STRING_PATTERN = rb'"[^"\\]*(?:\\.[^"\\]*)*"'
+# A container without nested containers
+_FLAT_PATTERN = rb"[\[{]" + _OTHER + rb"(?:" + _STRING_PATTERN + _OTHER + rb")*[\]}]"
+# A container whose nested containers are flat
+_NESTED_PATTERN = (
+    rb"[\[{]"
+    + _OTHER
+    + rb"(?:(?:"
+    + _STRING_PATTERN
+    + rb"|"
+    + _FLAT_PATTERN
+    + rb")"
+    + _OTHER
+    + rb")*[\]}]"
+)
+
+_WHITESPACE = re.compile(rb"[ \t\n\r]*")
+_STRING = re.compile(_STRING_PATTERN, re.DOTALL)
+_SCALAR = re.compile(rb"[^,}\] \t\n\r]+")
+# Everything up to and including the next bracket outside of a string
+_BRACKET = re.compile(
+    _OTHER + rb"(?:" + _STRING_PATTERN + _OTHER + rb")*[\[\]{}]", re.DOTALL
+)
+_CONTAINER = re.compile(_NESTED_PATTERN, re.DOTALL)
+_OPENING = frozenset(b"[{")
+
+_Buffer = bytes | mmap.mmap
+
+
+def _skip_whitespace(buf: _Buffer, pos: int) -> int:
+    match = _WHITESPACE.match(buf, pos)
+    return match.end() if match else pos
+
+
+def _skip_container(buf: _Buffer, pos: int) -> int:
+    # Shallow containers are skipped by a single regex match, the loop only
+    # runs for the brackets of deeper ones. The outermost container is always
+    # entered, matching a huge array at once keeps regex state per element.
+    depth = 0
+    while True:
+        if (
+            depth > 0
+            and buf[pos] in _OPENING
+            and (container := _CONTAINER.match(buf, pos))
+        ):
+            pos = container.end()
+        else:
+            depth += 1 if buf[pos] in _OPENING else -1
+            pos += 1
+        if depth == 0:
+            return pos
+        bracket = _BRACKET.match(buf, pos)
+        if bracket is None:
+            raise ValueError("Unexpected end of JSON input")
+        pos = bracket.end() - 1
+
+
+def _skip_value(buf: _Buffer, pos: int) -> int:
+    char = buf[pos : pos + 1]
+    if char == b'"':
+        return _string_end(buf, pos)
+    if char in (b"{", b"["):
+        return _skip_container(buf, pos)
+    match = _SCALAR.match(buf, pos)
+    if match is None:
+        raise ValueError(f"Invalid JSON value at byte {pos}")
+    return match.end()
+
+
+def _string_end(buf: _Buffer, pos: int) -> int:
+    match = _STRING.match(buf, pos)
+    if match is None:
+        raise ValueError(f"Unterminated JSON string at byte {pos}")
+    return match.end()
+
+
+def _find_key(buf: _Buffer, pos: int, key: str) -> int:
+    pos = _skip_whitespace(buf, pos)
+    if buf[pos : pos + 1] != b"{":
+        raise KeyError(key)
+    pos += 1
+    while True:
+        pos = _skip_whitespace(buf, pos)
+        if buf[pos : pos + 1] == b"}":
+            raise KeyError(key)
+        end = _string_end(buf, pos)
+        name = json.loads(buf[pos:end])
+        pos = _skip_whitespace(buf, end)
+        if buf[pos : pos + 1] != b":":
+            raise ValueError(f"Expected ':' at byte {pos}")
+        pos = _skip_whitespace(buf, pos + 1)
+        if name == key:
+            return pos
+        pos = _skip_whitespace(buf, _skip_value(buf, pos))
+        if buf[pos : pos + 1] == b",":
+            pos += 1
+
+
+def load_subtree(path: Path, *keys: str) -> Any:
+    if path.stat().st_size == 0:
+        raise ValueError(f"'{path.name}' is empty")
+    with path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        pos = 0
+        for key in keys:
+            pos = _find_key(buf, pos, key)
+        return json.loads(buf[pos : _skip_value(buf, pos)])
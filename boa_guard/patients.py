@@ -0,0 +1,163 @@
+import json
+import logging
+import sqlite3
+import time
+from collections.abc import Iterable, Iterator
+from contextlib import closing, contextmanager
+from pathlib import Path
+from typing import Any
+
+import requests
+import requests.auth
+
+from boa_guard.utils import FHIRServer
+
+logger = logging.getLogger("boa-guard")
+
+CACHE_NAME = "patient-cache.sqlite"
+HELD_BACK_NAME = "held_back.json"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS patients (
+    patient_id TEXT PRIMARY KEY,
+    checked_at REAL NOT NULL
+);
+"""
+
+
+@contextmanager
+def _connect(db: Path) -> Iterator[sqlite3.Connection]:
+    with closing(sqlite3.connect(db, timeout=60)) as con:
+        con.executescript(_SCHEMA)
+        with con:
+            yield con
+
+
+def _subject_patient(resource: dict[str, Any]) -> str | None:
+    reference = resource.get("subject", {}).get("reference", "")
+    return (
+        reference.removeprefix("Patient/") if reference.startswith("Patient/") else None
+    )
+
+
+def patient_ids(transaction: dict[str, Any]) -> set[str]:
+    return {
+        patient_id
+        for entry in transaction.get("entry", [])
+        if (patient_id := _subject_patient(entry["resource"])) is not None
+    }
+
+
+def _search_existing(
+    session: requests.Session, url: str, ids: list[str], timeout: float
+) -> set[str]:
+    found: set[str] = set()
+    next_url: str | None = f"{url.rstrip('/')}/Patient"
+    params: dict[str, Any] | None = {
+        "_id": ",".join(ids),
+        "_elements": "id",
+        "_count": len(ids),
+    }
+    while next_url is not None:
+        resp = session.get(next_url, params=params, timeout=timeout)
+        resp.raise_for_status()
+        searchset = resp.json()
+        found.update(
+            e["resource"]["id"]
+            for e in searchset.get("entry", [])
+            if e.get("resource", {}).get("resourceType") == "Patient"
+        )
+        # The next page link already contains the search parameters
+        next_url = next(
+            (
+                link["url"]
+                for link in searchset.get("link", [])
+                if link["relation"] == "next"
+            ),
+            None,
+        )
+        params = None
+    return found
+
+
+def find_missing(
+    server: FHIRServer,
+    ids: Iterable[str],
+    cache_db: Path,
+    ttl: float = 86400,
+    batch_size: int = 100,
+) -> set[str]:
+    # Only existing patients are cached, missing ones are checked again next time
+    ids = set(ids)
+    now = time.time()
+    with _connect(cache_db) as con:
+        cached = {
+            row[0]
+            for row in con.execute(
+                "SELECT patient_id FROM patients WHERE checked_at > ?", (now - ttl,)
+            )
+        }
+    unknown = sorted(ids - cached)
+
+    found: set[str] = set()
+    with requests.Session() as session:
+        session.auth = requests.auth.HTTPBasicAuth(server.user, server.pwd)
+        for i in range(0, len(unknown), batch_size):
+            found |= _search_existing(
+                session, server.url, unknown[i : i + batch_size], server.timeout
+            )
+
+    with _connect(cache_db) as con:
+        con.executemany(
+            "INSERT OR REPLACE INTO patients VALUES (?, ?)",
+            ((patient_id, now) for patient_id in found),
+        )
+    logger.info(
+        f"Checked {len(ids)} patient(s): {len(ids & cached)} cached, "
+        f"{len(unknown)} looked up in {-(-len(unknown) // batch_size)} request(s)."
+    )
+    return set(unknown) - found
+
+
+def hold_back(
+    transaction: dict[str, Any], missing: set[str]
+) -> tuple[dict[str, Any], list[dict[str, Any]]]:
+    kept: list[dict[str, Any]] = []
+    held: list[dict[str, Any]] = []
+    for entry in transaction.get("entry", []):
+        if _subject_patient(entry["resource"]) in missing:
+            held.append(entry)
+        else:
+            kept.append(entry)
+    return {**transaction, "entry": kept}, held
+
+
+def hold_back_missing(
+    server: FHIRServer,
+    transaction: dict[str, Any],
+    fhir_folder: Path,
+    ttl: float = 86400,
+) -> dict[str, Any]:
+    missing = find_missing(
+        server, patient_ids(transaction), fhir_folder / CACHE_NAME, ttl
+    )
+    transaction, held = hold_back(transaction, missing)
+
+    json_held = fhir_folder / HELD_BACK_NAME
+    if held:
+        logger.warning(
+            f"{len(missing)} patient(s) are missing on '{server.url}', holding back "
+            f"{len(held)} resource(s). See '{json_held}'."
+        )
+        with json_held.open("w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "missingPatients": sorted(missing),
+                    "entry": held,
+                },
+                f,
+                indent=2,
+            )
+    elif json_held.is_file():
+        json_held.unlink()
+    return transaction
@@ -1,65 +1,135 @@
 import json
 import logging
-import os
+from collections.abc import Iterable
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Any
 
 import requests
 import requests.auth
 
+from boa_guard import artifacts, patients, store
+from boa_guard.tx import create_transactions
+from boa_guard.utils import FHIRServer, check_env_vars
+
 logger = logging.getLogger("boa-guard")
 
 
 def post_transactions(
-    url: str, user: str, pwd: str, json_tx: Path, json_logs: Path
+    server: FHIRServer,
+    json_tx: Path,
+    json_logs: Path,
+    forward_compressed: bool = False,
 ) -> None:
-    url, user, pwd = (
-        os.environ["FHIR_URL"],
-        os.environ["FHIR_USER"],
-        os.environ["FHIR_PWD"],
-    )
+    compression = artifacts.detect_compression(json_tx)
+    if compression is None:
+        post_data(server, json_tx.read_bytes(), json_logs)
+    elif compression == "gzip" and forward_compressed:
+        # Send the file as is, the server inflates the body
+        post_data(server, json_tx.read_bytes(), json_logs, "gzip")
+    else:
+        # Decompress while sending, the body goes out chunked
+        with artifacts.open_artifact(json_tx) as f:
+            chunks = iter(lambda: f.read(1 << 20), b"")
+            post_data(server, chunks, json_logs)
+
+
+def post_data(
+    server: FHIRServer,
+    data: bytes | Iterable[bytes],
+    json_logs: Path | None,
+    content_encoding: str | None = None,
+) -> dict[str, Any]:
     headers = {"Content-Type": "application/fhir+json"}
-    data = json_tx.read_bytes()
+    if content_encoding is not None:
+        headers["Content-Encoding"] = content_encoding
 
     resp = requests.post(
-        url,
+        server.url,
         data=data,
         headers=headers,
-        auth=requests.auth.HTTPBasicAuth(user, pwd),
-        timeout=30,
+        auth=requests.auth.HTTPBasicAuth(server.user, server.pwd),
+        timeout=server.timeout,
     )
 
     if resp.ok:
-        logger.info(f"Successfully pushed FHIR transactions to '{url}'.")
+        logger.info(f"Successfully pushed FHIR transactions to '{server.url}'.")
     else:
-        logger.error(f"An error occured while pushing FHIR transactions to '{url}'.")
+        logger.error(
+            f"An error occured while pushing FHIR transactions to '{server.url}'."
+        )
 
-    with json_logs.open("w", encoding="utf-8") as f:
-        json.dump(resp.json(), f, indent=2)
-    logger.info(f"FHIR response saved in '{json_logs}'.")
+    response: dict[str, Any] = resp.json()
+    if json_logs is not None:
+        with json_logs.open("w", encoding="utf-8") as f:
+            json.dump(response, f, indent=2)
+        logger.info(f"FHIR response saved in '{json_logs}'.")
     resp.raise_for_status()
+    return response
+
+
+@dataclass
+class PushOptions:
+    # Studies to push from the shards instead of the transaction file
+    patient_id: list[str] | None = None
+    study_uid: list[str] | None = None
+    series_uid: list[str] | None = None
+    timeout: float = 30
+    forward_compressed: bool = False
+    check_patients: bool = False
+    patient_cache_ttl: float = 86400
 
 
-def main(fhir_folder: Path) -> None:
-    env_vars = ("FHIR_URL", "FHIR_USER", "FHIR_PWD")
-    json_tx = fhir_folder / "transaction_bundles.json"
+def main(fhir_folder: Path, **options: Any) -> None:
+    opts = PushOptions(**options)
+    json_tx = artifacts.find_artifact(fhir_folder, "transaction_bundles.json")
     json_logs = fhir_folder / "response.json"
+    selected = bool(opts.patient_id or opts.study_uid or opts.series_uid)
 
-    if not json_tx.is_file():
+    if not selected and json_tx is None:
         logger.warning(
             f"FHIR transactions are missing in '{fhir_folder}'. Run "
             "`boa-guard tx -f FHIR_FOLDER` to generate the FHIR bundles."
         )
         return
-    if missing := [k for k in env_vars if not os.getenv(k)]:
-        logger.error(
-            f"Missing env var(s): {', '.join(missing)}. Add them to your `.env`."
-        )
+    if not check_env_vars():
         return
 
-    post_transactions(
-        os.environ["FHIR_URL"],
-        os.environ["FHIR_USER"],
-        os.environ["FHIR_PWD"],
-        json_tx,
-        json_logs,
-    )
+    server = FHIRServer.from_env(opts.timeout)
+    if selected or opts.check_patients:
+        if opts.forward_compressed:
+            logger.warning(
+                "--forward-compressed is ignored, the transaction is rebuilt "
+                "for the selection or patient check and sent uncompressed."
+            )
+        transaction = select_transaction(server, fhir_folder, json_tx, opts)
+        if transaction is not None:
+            data = json.dumps(transaction).encode("utf-8")
+            post_data(server, data, json_logs)
+    elif json_tx is not None:
+        post_transactions(server, json_tx, json_logs, opts.forward_compressed)
+
+
+def select_transaction(
+    server: FHIRServer, fhir_folder: Path, json_tx: Path | None, opts: PushOptions
+) -> dict[str, Any] | None:
+    if opts.patient_id or opts.study_uid or opts.series_uid:
+        # Build the transaction for the selected studies from the shards
+        bundle_dict = store.select_bundles(
+            fhir_folder, opts.patient_id, opts.study_uid, opts.series_uid
+        )
+        if bundle_dict is None:
+            return None
+        transaction = create_transactions(bundle_dict)
+    elif json_tx is not None:
+        transaction = artifacts.read_json(json_tx)
+    else:
+        return None
+    if opts.check_patients:
+        transaction = patients.hold_back_missing(
+            server, transaction, fhir_folder, opts.patient_cache_ttl
+        )
+        if not transaction["entry"]:
+            logger.warning("Nothing left to push, all patients are missing.")
+            return None
+    return transaction
@@ -0,0 +1,72 @@
+import logging
+import os
+import queue
+import threading
+from collections.abc import Generator, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+logger = logging.getLogger("boa-guard")
+
+# Leaf folders with thousands of files and no reports in them
+DEFAULT_SKIP_DIRS = ("dicoms",)
+
+
+def _is_report(name: str) -> bool:
+    # Same as the former `rglob("[!~$]*.xlsx")`, skip the lock/temp Excel files
+    return name.endswith(".xlsx") and name[0] not in {"~", "$"}
+
+
+class _Walker:
+    # Sibling subtrees are walked in parallel, `results` ends with None once
+    # every submitted folder was visited
+    def __init__(self, skip_dirs: Iterable[str], max_workers: int) -> None:
+        self.skip = frozenset(skip_dirs)
+        self.results: queue.Queue[Path | None] = queue.Queue()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.lock = threading.Lock()
+        self.pending = 0
+
+    def submit(self, path: str) -> None:
+        with self.lock:
+            self.pending += 1
+        try:
+            self.executor.submit(self.visit, path)
+        except RuntimeError:
+            # The consumer stopped early and the executor is shut down
+            self.done()
+
+    def done(self) -> None:
+        with self.lock:
+            self.pending -= 1
+            if self.pending == 0:
+                self.results.put(None)
+
+    def visit(self, path: str) -> None:
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in self.skip:
+                            self.submit(entry.path)
+                    elif _is_report(entry.name) and entry.is_file():
+                        self.results.put(Path(entry.path))
+        except OSError as e:
+            logger.warning(f"Could not scan '{path}': {type(e).__name__}: {e}")
+        finally:
+            self.done()
+
+
+def iter_excel_files(
+    root: Path,
+    skip_dirs: Iterable[str] = (),
+    max_workers: int = 8,
+) -> Generator[Path, None, None]:
+    # `skip_dirs` are skipped in addition to `DEFAULT_SKIP_DIRS`
+    walker = _Walker((*DEFAULT_SKIP_DIRS, *skip_dirs), max_workers)
+    try:
+        walker.submit(str(root))
+        while (excel_file := walker.results.get()) is not None:
+            yield excel_file
+    finally:
+        walker.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,188 @@
+import hashlib
+import logging
+import sqlite3
+from collections.abc import Iterable, Iterator
+from contextlib import closing, contextmanager
+from pathlib import Path
+from typing import Any
+
+from boa_guard import artifacts
+
+logger = logging.getLogger("boa-guard")
+
+STORE_DIR = "studies"
+INDEX_NAME = "index.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS studies (
+    image_id TEXT PRIMARY KEY,
+    patient_id TEXT,
+    study_uid TEXT,
+    series_uid TEXT,
+    path TEXT NOT NULL,
+    hash TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS studies_patient_id ON studies (patient_id);
+CREATE INDEX IF NOT EXISTS studies_study_uid ON studies (study_uid);
+CREATE INDEX IF NOT EXISTS studies_series_uid ON studies (series_uid);
+"""
+
+
+def store_folder(fhir_folder: Path) -> Path:
+    return fhir_folder / STORE_DIR
+
+
+def has_store(fhir_folder: Path) -> bool:
+    return (store_folder(fhir_folder) / INDEX_NAME).is_file()
+
+
+@contextmanager
+def _connect(fhir_folder: Path) -> Iterator[sqlite3.Connection]:
+    folder = store_folder(fhir_folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    # Generous timeout, several writers may share the index
+    with closing(sqlite3.connect(folder / INDEX_NAME, timeout=60)) as con:
+        con.executescript(_SCHEMA)
+        with con:
+            yield con
+
+
+def study_keys(bundle: list[dict[str, Any]]) -> dict[str, str | None]:
+    imaging_study = next(
+        (r["ImagingStudy"] for r in bundle if "ImagingStudy" in r), None
+    )
+    if imaging_study is None:
+        raise ValueError("The bundle does not contain an ImagingStudy.")
+
+    study_uid = next(
+        (
+            i["value"].removeprefix("urn:oid:")
+            for i in imaging_study["identifier"]
+            if i["system"] == "urn:dicom:uid"
+        ),
+        None,
+    )
+    series_uid = imaging_study["series"][0]["uid"]
+    patient_id = imaging_study["subject"]["reference"].removeprefix("Patient/")
+    # Every Observation carries the ImageID of `bundles.get_dicom_dict`
+    image_id = next(
+        (
+            r["Observation"]["derivedFrom"]
+            for r in bundle
+            if "derivedFrom" in r.get("Observation", {})
+        ),
+        None,
+    )
+    return {
+        "ImageID": image_id,
+        "PatientID": patient_id,
+        "StudyInstanceUID": study_uid,
+        "SeriesInstanceUID": series_uid,
+    }
+
+
+def write_studies(
+    fhir_folder: Path,
+    bundles: Iterable[list[dict[str, Any]]],
+    compression: str | None = None,
+) -> int:
+    # Shards are keyed by the ImageID, writing a study again replaces it
+    folder = store_folder(fhir_folder)
+    count = 0
+    with _connect(fhir_folder) as con:
+        for bundle in bundles:
+            keys = study_keys(bundle)
+            if keys["ImageID"] is None:
+                logger.warning(
+                    "Skipping shard for Patient "
+                    f"'{keys['PatientID']}': the bundle has no Observation "
+                    "with an ImageID."
+                )
+                continue
+            shard = artifacts.artifact_path(
+                folder, f"{keys['ImageID']}.json", compression
+            )
+            # The temporary file keeps the suffix that selects the compression
+            tmp = shard.with_name(f".{shard.name}")
+            artifacts.write_json(tmp, bundle)
+            data_hash = hashlib.sha256(tmp.read_bytes()).hexdigest()
+            tmp.replace(shard)
+            for suffix in ("", *artifacts.COMPRESSIONS.values()):
+                stale = folder / f"{keys['ImageID']}.json{suffix}"
+                if stale != shard:
+                    stale.unlink(missing_ok=True)
+            con.execute(
+                "INSERT OR REPLACE INTO studies VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    keys["ImageID"],
+                    keys["PatientID"],
+                    keys["StudyInstanceUID"],
+                    keys["SeriesInstanceUID"],
+                    shard.name,
+                    data_hash,
+                ),
+            )
+            count += 1
+    return count
+
+
+def query_studies(
+    fhir_folder: Path,
+    patient_ids: list[str] | None = None,
+    study_uids: list[str] | None = None,
+    series_uids: list[str] | None = None,
+) -> list[dict[str, str]]:
+    # Selectors are AND-ed, an empty selector matches every study
+    clauses: list[str] = []
+    params: list[str] = []
+    for column, values in (
+        ("patient_id", patient_ids),
+        ("study_uid", study_uids),
+        ("series_uid", series_uids),
+    ):
+        if values:
+            clauses.append(f"{column} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+
+    with _connect(fhir_folder) as con:
+        con.row_factory = sqlite3.Row
+        rows = con.execute(
+            f"SELECT * FROM studies{where} ORDER BY image_id", params
+        ).fetchall()
+    return [dict(r) for r in rows]
+
+
+def load_studies(fhir_folder: Path, rows: list[dict[str, str]]) -> list[dict[str, Any]]:
+    folder = store_folder(fhir_folder)
+    result: list[dict[str, Any]] = []
+    for row in rows:
+        data = (folder / row["path"]).read_bytes()
+        if hashlib.sha256(data).hexdigest() != row["hash"]:
+            raise ValueError(
+                f"Shard '{row['path']}' does not match its hash in the index. "
+                "Re-run `boa-guard bundles` for this study."
+            )
+        result.extend(artifacts.loads(data))
+    return result
+
+
+def select_bundles(
+    fhir_folder: Path,
+    patient_ids: list[str] | None = None,
+    study_uids: list[str] | None = None,
+    series_uids: list[str] | None = None,
+) -> list[dict[str, Any]] | None:
+    if not has_store(fhir_folder):
+        logger.warning(
+            f"The study index is missing in '{fhir_folder}'. Run "
+            "`boa-guard bundles -f FHIR_FOLDER -b BOA_FOLDER` to "
+            "generate the FHIR bundles."
+        )
+        return None
+    rows = query_studies(fhir_folder, patient_ids, study_uids, series_uids)
+    if not rows:
+        logger.warning(f"No studies in '{fhir_folder}' match the given selection.")
+        return None
+    logger.info(f"Selected {len(rows)} stud{'y' if len(rows) == 1 else 'ies'}.")
+    return load_studies(fhir_folder, rows)
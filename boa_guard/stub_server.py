@@ -0,0 +1,335 @@
+import argparse
+import gzip
+import json
+import logging
+import random
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+logger = logging.getLogger("boa-guard")
+
+
+@dataclass
+class StubConfig:
+    # Seconds added to every request, `jitter` is added uniformly on top
+    latency: float = 0.0
+    jitter: float = 0.0
+    # Probability of answering a request with 429 / 503 instead of processing it
+    rate_limit_rate: float = 0.0
+    unavailable_rate: float = 0.0
+    retry_after: int = 1
+    # Probability of a single entry failing with 422
+    entry_failure_rate: float = 0.0
+    seed: int | None = None
+    # Patients that already exist on the server
+    patients: list[str] = field(default_factory=list)
+    # Largest page of search results, servers cap `_count` like this
+    page_size: int = 1000
+    # Some servers answer HEAD with 405 Method Not Allowed
+    allow_head: bool = True
+
+
+@dataclass
+class StubStats:
+    requests: int = 0
+    bytes_received: int = 0
+    bytes_sent: int = 0
+    status_codes: dict[int, int] = field(default_factory=dict)
+
+
+class StubFHIRServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], config: StubConfig) -> None:
+        super().__init__(address, _Handler)
+        self.config = config
+        self.stats = StubStats()
+        self.resources: dict[str, Any] = {
+            f"Patient/{i}": {"resourceType": "Patient", "id": i}
+            for i in config.patients
+        }
+        self.lock = threading.Lock()
+        self.random = random.Random(config.seed)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host!s}:{port}/fhir"
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+
+
+def _outcome(severity: str, code: str, diagnostics: str) -> dict[str, Any]:
+    return {
+        "resourceType": "OperationOutcome",
+        "issue": [{"severity": severity, "code": code, "diagnostics": diagnostics}],
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: StubFHIRServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug(f"{self.address_string()} {format % args}")
+
+    def _send(
+        self,
+        status: int,
+        body: dict[str, Any] | bytes | None = None,
+        headers: dict[str, str] | None = None,
+    ) -> None:
+        if isinstance(body, dict):
+            data = json.dumps(body).encode("utf-8")
+        else:
+            data = body or b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/fhir+json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(data)
+        with self.server.lock:
+            stats = self.server.stats
+            stats.bytes_sent += len(data)
+            stats.status_codes[status] = stats.status_codes.get(status, 0) + 1
+
+    def _read_chunked(self) -> bytes:
+        chunks: list[bytes] = []
+        while size := int(self.rfile.readline().split(b";")[0], 16):
+            chunks.append(self.rfile.read(size))
+            self.rfile.readline()
+        # Trailer section
+        while self.rfile.readline() not in {b"\r\n", b"\n", b""}:
+            pass
+        return b"".join(chunks)
+
+    def _read_body(self) -> bytes:
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            data = self._read_chunked()
+        else:
+            data = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with self.server.lock:
+            self.server.stats.requests += 1
+            self.server.stats.bytes_received += len(data)
+        if self.headers.get("Content-Encoding", "").lower() == "gzip":
+            data = gzip.decompress(data)
+        return data
+
+    def _path(self) -> str:
+        return self.path.split("?")[0].removeprefix("/fhir").strip("/")
+
+    def _inject_errors(self) -> bool:
+        config = self.server.config
+        time.sleep(config.latency + self.server.random.uniform(0, config.jitter))
+        draw = self.server.random.random()
+        if draw < config.rate_limit_rate:
+            self._send(
+                429,
+                _outcome("error", "throttled", "Too many requests"),
+                {"Retry-After": str(config.retry_after)},
+            )
+            return True
+        if draw < config.rate_limit_rate + config.unavailable_rate:
+            self._send(
+                503,
+                _outcome("fatal", "transient", "Service unavailable"),
+                {"Retry-After": str(config.retry_after)},
+            )
+            return True
+        return False
+
+    def do_POST(self) -> None:
+        data = self._read_body()
+        if self._inject_errors():
+            return
+        try:
+            bundle = json.loads(data)
+        except ValueError as e:
+            self._send(400, _outcome("error", "invalid", str(e)))
+            return
+        if self._path() or bundle.get("resourceType") != "Bundle":
+            self._send(400, _outcome("error", "not-supported", "Expected a Bundle"))
+            return
+        if bundle.get("type") not in {"transaction", "batch"}:
+            self._send(400, _outcome("error", "invalid", "Unsupported Bundle type"))
+            return
+        self._process_bundle(bundle)
+
+    def _process_bundle(self, bundle: dict[str, Any]) -> None:
+        is_transaction = bundle["type"] == "transaction"
+        entries: list[dict[str, Any]] = []
+        updates: dict[str, Any] = {}
+        for entry in bundle.get("entry", []):
+            request = entry.get("request", {})
+            key = request.get("url", "")
+            if self.server.random.random() < self.server.config.entry_failure_rate:
+                outcome = _outcome("error", "processing", f"Rejected '{key}'")
+                if is_transaction:
+                    # Transactions are all or nothing
+                    self._send(422, outcome)
+                    return
+                entries.append(
+                    {
+                        "response": {
+                            "status": "422 Unprocessable Entity",
+                            "outcome": outcome,
+                        }
+                    }
+                )
+                continue
+            with self.server.lock:
+                existing = key in self.server.resources or key in updates
+            updates[key] = entry.get("resource")
+            entries.append(
+                {
+                    "response": {
+                        "status": "200 OK" if existing else "201 Created",
+                        "location": f"{key}/_history/1",
+                        "etag": 'W/"1"',
+                        "lastModified": _now(),
+                    }
+                }
+            )
+        with self.server.lock:
+            self.server.resources.update(updates)
+        self._send(
+            200,
+            {
+                "resourceType": "Bundle",
+                "type": f"{bundle['type']}-response",
+                "entry": entries,
+            },
+        )
+
+    def do_PUT(self) -> None:
+        data = self._read_body()
+        if self._inject_errors():
+            return
+        key = self._path()
+        with self.server.lock:
+            existing = key in self.server.resources
+            self.server.resources[key] = data
+        self._send(200 if existing else 201, headers={"Location": f"{key}/_history/1"})
+
+    def do_GET(self) -> None:
+        self._read_body()
+        if self._inject_errors():
+            return
+        path = self._path()
+        query = parse_qs(urlsplit(self.path).query)
+        if "/" in path:
+            with self.server.lock:
+                resource = self.server.resources.get(path)
+            if resource is not None:
+                # Binaries are stored and returned as uploaded
+                self._send(200, resource)
+            else:
+                self._send(404, _outcome("error", "not-found", f"'{path}' not found"))
+            return
+
+        # Search, only `_id`, `_count` and the paging offset are supported
+        ids = {i for v in query.get("_id", []) for i in v.split(",")}
+        with self.server.lock:
+            matches = [
+                self.server.resources[f"{path}/{i}"]
+                for i in sorted(ids)
+                if f"{path}/{i}" in self.server.resources
+            ]
+        count = min(
+            int(query.get("_count", [self.server.config.page_size])[0]),
+            self.server.config.page_size,
+        )
+        offset = int(query.get("_getpagesoffset", ["0"])[0])
+        links = []
+        if offset + count < len(matches):
+            params = urlencode(
+                {
+                    "_id": ",".join(sorted(ids)),
+                    "_count": count,
+                    "_getpagesoffset": offset + count,
+                }
+            )
+            links.append(
+                {"relation": "next", "url": f"{self.server.url}/{path}?{params}"}
+            )
+        self._send(
+            200,
+            {
+                "resourceType": "Bundle",
+                "type": "searchset",
+                "total": len(matches),
+                "link": links,
+                "entry": [
+                    {"resource": r, "search": {"mode": "match"}}
+                    for r in matches[offset : offset + count]
+                ],
+            },
+        )
+
+    def do_HEAD(self) -> None:
+        self._read_body()
+        if not self.server.config.allow_head:
+            self._send(405, _outcome("error", "not-supported", "HEAD not allowed"))
+            return
+        with self.server.lock:
+            existing = self._path() in self.server.resources
+        self._send(200 if existing else 404)
+
+
+@contextmanager
+def serve(
+    config: StubConfig | None = None, host: str = "127.0.0.1", port: int = 0
+) -> Iterator[StubFHIRServer]:
+    # Port 0 picks a free port, see `StubFHIRServer.url`
+    server = StubFHIRServer((host, port), config or StubConfig())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m boa_guard.stub_server",
+        description="Local stand-in FHIR server for testing `boa-guard push`.",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--unavailable-rate", type=float, default=0.0)
+    parser.add_argument("--entry-failure-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--no-head", dest="allow_head", action="store_false")
+    parser.add_argument("--patient", dest="patients", action="append", default=[])
+    args = vars(parser.parse_args(argv))
+    host, port = args.pop("host"), args.pop("port")
+
+    with serve(StubConfig(**args), host, port) as server:
+        logger.info(f"Stand-in FHIR server listening on '{server.url}'.")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,47 @@
-import json
 import logging
 from pathlib import Path
 from typing import Any
 
+from boa_guard import artifacts, store
+
 logger = logging.getLogger("boa-guard")
 
 
-def main(fhir_folder: Path) -> None:
-    json_bundle = fhir_folder / "fhir-bundles.json"
-    json_output = fhir_folder / "transaction_bundles.json"
+def main(
+    fhir_folder: Path,
+    patient_id: list[str] | None = None,
+    study_uid: list[str] | None = None,
+    series_uid: list[str] | None = None,
+    compress: str | None = None,
+) -> None:
+    json_bundle = artifacts.find_artifact(fhir_folder, "fhir-bundles.json")
+    json_output = artifacts.artifact_path(
+        fhir_folder, "transaction_bundles.json", compress
+    )
 
-    if not json_bundle.is_file():
+    # Distributed `bundles` runs only write the study shards
+    if (
+        patient_id
+        or study_uid
+        or series_uid
+        or (json_bundle is None and store.has_store(fhir_folder))
+    ):
+        selection = store.select_bundles(fhir_folder, patient_id, study_uid, series_uid)
+        if selection is None:
+            return
+        bundle_dict: list[dict[str, Any]] = selection
+    elif json_bundle is None:
         logger.warning(
             f"FHIR bundles are missing in '{fhir_folder}'. Run "
             "`boa-guard bundles -f FHIR_FOLDER -b BOA_FOLDER` to "
             "generate the FHIR bundles."
         )
         return
-
-    with json_bundle.open(encoding="utf-8") as f:
-        bundle_dict: list[dict[str, Any]] = json.load(f)
+    else:
+        bundle_dict = artifacts.read_json(json_bundle)
     transaction_dict = create_transactions(bundle_dict)
 
-    with json_output.open("w", encoding="utf-8") as f:
-        json.dump(transaction_dict, f, indent=2)
+    artifacts.write_json(json_output, transaction_dict)
     logger.info(f"Successfully created FHIR transactions in '{fhir_folder}'.")
 
 
@@ -1,7 +1,50 @@
 import hashlib
+import logging
+import os
 import secrets
+from dataclasses import dataclass
+from pathlib import Path
+
+logger = logging.getLogger("boa-guard")
+
+FHIR_ENV_VARS = ("FHIR_URL", "FHIR_USER", "FHIR_PWD")
 
 
 def generate_hash(nbytes: int = 32) -> str:
     random_bytes = secrets.token_bytes(nbytes)
     return hashlib.sha256(random_bytes).hexdigest()
+
+
+def file_sha1(path: Path, chunk_size: int = 1 << 20) -> str:
+    sha1 = hashlib.sha1()
+    with path.open("rb") as f:
+        while chunk := f.read(chunk_size):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+@dataclass
+class FHIRServer:
+    url: str
+    user: str
+    pwd: str
+    # Seconds to wait for the server
+    timeout: float = 30
+
+    @classmethod
+    def from_env(cls, timeout: float = 30) -> "FHIRServer":
+        return cls(
+            os.environ["FHIR_URL"],
+            os.environ["FHIR_USER"],
+            os.environ["FHIR_PWD"],
+            timeout,
+        )
+
+
+def check_env_vars() -> bool:
+    if missing := [k for k in FHIR_ENV_VARS if not os.getenv(k)]:
+        logger.error(
+            f"Missing env var(s): {', '.join(missing)}. Add them to your `.env`."
+        )
+        return False
+    return True
@@ -0,0 +1,280 @@
+import logging
+import sqlite3
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import closing, contextmanager
+from functools import partial
+from itertools import islice
+from pathlib import Path
+
+logger = logging.getLogger("boa-guard")
+
+QUEUE_NAME = "work-queue.sqlite"
+# Idle workers check this often whether the scan added new folders
+POLL_SECONDS = 5.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS folders (
+    excel TEXT PRIMARY KEY,
+    state TEXT NOT NULL DEFAULT 'pending',
+    owner TEXT,
+    expires_at REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS folders_state ON folders (state, expires_at);
+CREATE TABLE IF NOT EXISTS scan (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    state TEXT NOT NULL,
+    owner TEXT,
+    expires_at REAL
+);
+"""
+
+
+@contextmanager
+def _connect(db: Path) -> Iterator[sqlite3.Connection]:
+    # Autocommit mode, the write transactions are started explicitly
+    with closing(sqlite3.connect(db, timeout=60, isolation_level=None)) as con:
+        con.executescript(_SCHEMA)
+        yield con
+
+
+@contextmanager
+def _immediate(con: sqlite3.Connection) -> Iterator[None]:
+    # Take the write lock up front so two workers can't claim the same row
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        yield
+    except BaseException:
+        con.execute("ROLLBACK")
+        raise
+    con.execute("COMMIT")
+
+
+def enqueue(db: Path, excel_files: Iterable[Path], batch_size: int = 500) -> int:
+    added = 0
+    iterator = iter(excel_files)
+    with _connect(db) as con:
+        # Commit in batches, other workers can claim while the scan is running
+        while batch := [(str(p),) for p in islice(iterator, batch_size)]:
+            with _immediate(con):
+                cursor = con.executemany(
+                    "INSERT OR IGNORE INTO folders (excel) VALUES (?)", batch
+                )
+                added += cursor.rowcount
+    return added
+
+
+def claim_scan(db: Path, worker_id: str, lease_seconds: float) -> bool:
+    # Only one worker scans the BOA folder, the scan is leased like a folder
+    now = time.time()
+    with _connect(db) as con, _immediate(con):
+        row = con.execute("SELECT state, owner, expires_at FROM scan").fetchone()
+        if row is not None and (row[0] == "done" or row[2] >= now):
+            return False
+        if row is not None:
+            logger.warning(f"Scan lease of '{row[1]}' expired, scanning again.")
+        con.execute(
+            "INSERT OR REPLACE INTO scan VALUES (0, 'running', ?, ?)",
+            (worker_id, now + lease_seconds),
+        )
+    return True
+
+
+def heartbeat_scan(db: Path, worker_id: str, lease_seconds: float) -> bool:
+    with _connect(db) as con, _immediate(con):
+        cursor = con.execute(
+            "UPDATE scan SET expires_at = ? WHERE owner = ? AND state = 'running'",
+            (time.time() + lease_seconds, worker_id),
+        )
+        return cursor.rowcount == 1
+
+
+def finish_scan(db: Path, worker_id: str) -> bool:
+    with _connect(db) as con, _immediate(con):
+        cursor = con.execute(
+            "UPDATE scan SET state = 'done', expires_at = NULL "
+            "WHERE owner = ? AND state = 'running'",
+            (worker_id,),
+        )
+        return cursor.rowcount == 1
+
+
+def scan_done(db: Path) -> bool:
+    with _connect(db) as con:
+        row = con.execute("SELECT state FROM scan").fetchone()
+    return row is not None and row[0] == "done"
+
+
+def reset(db: Path, rescan: bool = False, requeue: Iterable[str] = ()) -> int:
+    # Finished folders stay finished across runs, new reports are only found
+    # by scanning again
+    with _connect(db) as con, _immediate(con):
+        if rescan:
+            con.execute("DELETE FROM scan")
+        states = list(requeue)
+        cursor = con.execute(
+            "UPDATE folders SET state = 'pending', owner = NULL, "
+            "expires_at = NULL, attempts = 0, error = NULL "
+            f"WHERE state IN ({', '.join('?' * len(states))})",
+            states,
+        )
+        return cursor.rowcount
+
+
+def claim(
+    db: Path, worker_id: str, lease_seconds: float, max_attempts: int = 3
+) -> Path | None:
+    now = time.time()
+    with _connect(db) as con, _immediate(con):
+        # Leases of dead workers expire and are handed out again
+        expired = con.execute(
+            "SELECT excel, owner FROM folders "
+            "WHERE state = 'leased' AND expires_at < ?",
+            (now,),
+        ).fetchall()
+        for excel, owner in expired:
+            logger.warning(f"Lease of '{owner}' on '{excel}' expired, reclaiming.")
+        con.execute(
+            "UPDATE folders SET state = CASE WHEN attempts >= ? THEN 'failed' "
+            "ELSE 'pending' END, owner = NULL, expires_at = NULL, "
+            "error = CASE WHEN attempts >= ? THEN 'Lease expired too often' END "
+            "WHERE state = 'leased' AND expires_at < ?",
+            (max_attempts, max_attempts, now),
+        )
+        row = con.execute(
+            "SELECT excel FROM folders WHERE state = 'pending' LIMIT 1"
+        ).fetchone()
+        if row is None:
+            return None
+        con.execute(
+            "UPDATE folders SET state = 'leased', owner = ?, expires_at = ?, "
+            "attempts = attempts + 1 WHERE excel = ?",
+            (worker_id, now + lease_seconds, row[0]),
+        )
+    return Path(row[0])
+
+
+def heartbeat(db: Path, excel: Path, worker_id: str, lease_seconds: float) -> bool:
+    with _connect(db) as con, _immediate(con):
+        cursor = con.execute(
+            "UPDATE folders SET expires_at = ? "
+            "WHERE excel = ? AND owner = ? AND state = 'leased'",
+            (time.time() + lease_seconds, str(excel), worker_id),
+        )
+        return cursor.rowcount == 1
+
+
+def finish(db: Path, excel: Path, worker_id: str, error: str | None = None) -> bool:
+    with _connect(db) as con, _immediate(con):
+        cursor = con.execute(
+            "UPDATE folders SET state = ?, error = ?, expires_at = NULL "
+            "WHERE excel = ? AND owner = ? AND state = 'leased'",
+            ("done" if error is None else "failed", error, str(excel), worker_id),
+        )
+        return cursor.rowcount == 1
+
+
+def counts(db: Path) -> dict[str, int]:
+    with _connect(db) as con:
+        return dict(con.execute("SELECT state, COUNT(*) FROM folders GROUP BY state"))
+
+
+@contextmanager
+def _keep_alive(
+    renew: Callable[[], bool], what: str, lease_seconds: float
+) -> Iterator[None]:
+    stop = threading.Event()
+
+    def beat() -> None:
+        while not stop.wait(lease_seconds / 3):
+            if not renew():
+                logger.warning(f"Lost the lease on {what}.")
+                return
+
+    thread = threading.Thread(target=beat, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def _scan(
+    db: Path, worker_id: str, scan: Callable[[], Iterable[Path]], lease_seconds: float
+) -> None:
+    try:
+        with _keep_alive(
+            partial(heartbeat_scan, db, worker_id, lease_seconds),
+            "the scan",
+            lease_seconds,
+        ):
+            added = enqueue(db, scan())
+    except Exception as e:
+        # The lease expires and another worker scans again
+        logger.error(f"The scan failed: {type(e).__name__}: {e}")
+        return
+    finish_scan(db, worker_id)
+    logger.info(f"Worker '{worker_id}' added {added} new folder(s) to '{db}'.")
+
+
+def _process(process: Callable[[Path], str | None], excel: Path) -> str | None:
+    try:
+        return process(excel)
+    except Exception as e:
+        logger.error(
+            f"An Error occurred while processing '{excel}': {type(e).__name__}: {e}"
+        )
+        return f"{type(e).__name__}: {e}"
+
+
+def run_worker(
+    db: Path,
+    worker_id: str,
+    process: Callable[[Path], str | None],
+    scan: Callable[[], Iterable[Path]],
+    lease_seconds: float = 300,
+) -> int:
+    # `process` returns an error message for folders that can't be processed,
+    # exceptions are recorded as errors too. Workers claim folders while one of
+    # them is still scanning, and only stop once the scan is done.
+    processed = 0
+    scanner: threading.Thread | None = None
+    while True:
+        if (scanner is None or not scanner.is_alive()) and claim_scan(
+            db, worker_id, lease_seconds
+        ):
+            scanner = threading.Thread(
+                target=_scan, args=(db, worker_id, scan, lease_seconds), daemon=True
+            )
+            scanner.start()
+        # Checked before claiming, so folders added at the end of the scan
+        # are not missed
+        done = scan_done(db)
+        excel = claim(db, worker_id, lease_seconds)
+        if excel is None:
+            if done:
+                break
+            if scanner is not None and scanner.is_alive():
+                # Wake up early once our own scan is done
+                scanner.join(POLL_SECONDS)
+            else:
+                time.sleep(POLL_SECONDS)
+            continue
+        with _keep_alive(
+            partial(heartbeat, db, excel, worker_id, lease_seconds),
+            f"'{excel}'",
+            lease_seconds,
+        ):
+            error = _process(process, excel)
+        if not finish(db, excel, worker_id, error):
+            logger.warning(
+                f"The lease on '{excel}' was taken over by another worker "
+                f"before '{worker_id}' finished."
+            )
+        processed += 1
+    logger.info(f"Worker '{worker_id}' processed {processed} folder(s): {counts(db)}")
+    return processed
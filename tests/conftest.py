@@ -0,0 +1,47 @@
+from collections.abc import Callable, Iterator
+from contextlib import AbstractContextManager, contextmanager
+from typing import Any
+
+import pytest
+
+from boa_guard.stub_server import StubConfig, StubFHIRServer, serve
+
+
+def _transaction(*patient_ids: str) -> dict[str, Any]:
+    # One Observation per patient, `Observation/obs-<PatientID>`
+    return {
+        "resourceType": "Bundle",
+        "type": "transaction",
+        "entry": [
+            {
+                "resource": {
+                    "resourceType": "Observation",
+                    "id": f"obs-{patient_id}",
+                    "subject": {"reference": f"Patient/{patient_id}"},
+                },
+                "request": {"method": "PUT", "url": f"Observation/obs-{patient_id}"},
+            }
+            for patient_id in patient_ids
+        ],
+    }
+
+
+@pytest.fixture
+def make_transaction() -> Callable[..., dict[str, Any]]:
+    return _transaction
+
+
+@pytest.fixture
+def serve_env(
+    monkeypatch: pytest.MonkeyPatch,
+) -> Callable[..., AbstractContextManager[StubFHIRServer]]:
+    # Runs the stand-in server with the FHIR_* env vars pointing to it
+    @contextmanager
+    def run(config: StubConfig | None = None) -> Iterator[StubFHIRServer]:
+        with serve(config) as server:
+            monkeypatch.setenv("FHIR_URL", server.url)
+            monkeypatch.setenv("FHIR_USER", "user")
+            monkeypatch.setenv("FHIR_PWD", "pwd")
+            yield server
+
+    return run
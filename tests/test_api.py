@@ -0,0 +1,76 @@
+import pytest
+import requests
+
+from boa_guard.api import BOAResult, build_bundles, push_results
+from boa_guard.stub_server import StubConfig, serve
+from boa_guard.utils import FHIRServer
+
+DICOM = {
+    "StudyInstanceUID": "1.2.3",
+    "SeriesInstanceUID": "1.2.3.4",
+    "PatientID": "P1",
+    "SeriesNumber": "1",
+    "Modality": "CT",
+    "SeriesDescription": "Abdomen",
+    "AccessionNumber": "A1",
+    "ImageID": "abc",
+    "Started": "2024-01-02T10:11:12+01:00",
+    "Effective": "2024-01-02T10:15:00+01:00",
+    "NumberOfInstances": 3,
+}
+INFO = {
+    "BOAVersion": "1.0",
+    "BOAGitHash": "abc",
+    "PredictedContrastPhase": "NATIVE",
+    "PredictedContrastInGIT": "NO",
+}
+
+
+def test_build_bundles() -> None:
+    total = {"segmentations": {"total": {"liver": {"present": True, "volume_ml": 1}}}}
+    bundle = build_bundles(BOAResult({"aggregated": {}}, total, DICOM, INFO))
+    assert [next(iter(r)) for r in bundle] == [
+        "ImagingStudy",
+        "Observation",
+        "DiagnosticReport",
+    ]
+
+
+def test_build_bundles_missing_info() -> None:
+    info = {k: v for k, v in INFO.items() if k != "BOAGitHash"}
+    with pytest.raises(ValueError, match="BOAGitHash"):
+        build_bundles(BOAResult({}, {}, DICOM, info))
+
+
+def test_build_bundles_attachment_url() -> None:
+    reports = [
+        {
+            "contentType": "application/pdf",
+            "size": 10,
+            "hash": "da39a3ee5e6b4b0d3255bfef95601890afd80709",
+            "title": "BOA PDF Report",
+            "creation": "2024-01-02T10:15:00.000+01:00",
+        }
+    ]
+    info = {**INFO, "reports": reports}
+    report = build_bundles(BOAResult({"aggregated": {}}, {}, DICOM, info))[-1]
+    assert "url" not in report["DiagnosticReport"]["presentedForm"][0]
+
+    reports[0]["url"] = f"Binary/{reports[0]['hash']}"
+    report = build_bundles(BOAResult({"aggregated": {}}, {}, DICOM, info))[-1]
+    assert report["DiagnosticReport"]["presentedForm"][0]["url"] == reports[0]["url"]
+
+
+def test_push_results() -> None:
+    total = {"segmentations": {"total": {"liver": {"present": True, "volume_ml": 1}}}}
+    result = BOAResult({"aggregated": {}}, total, DICOM, INFO)
+    with serve() as server:
+        response = push_results([result], FHIRServer(server.url, "user", "pwd", 5))
+        assert len(server.resources) == len(response["entry"]) == 3
+
+
+def test_push_results_timeout() -> None:
+    with serve(StubConfig(latency=1.0)) as server:
+        fhir = FHIRServer(server.url, "user", "pwd", timeout=0.2)
+        with pytest.raises(requests.Timeout):
+            push_results([BOAResult({"aggregated": {}}, {}, DICOM, INFO)], fhir)
@@ -0,0 +1,41 @@
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from boa_guard.attachments import BinaryUploader
+from boa_guard.stub_server import StubConfig, serve
+from boa_guard.utils import FHIRServer, file_sha1
+
+
+def report(tmp_path: Path) -> dict[str, Any]:
+    path = tmp_path / "report.pdf"
+    path.write_bytes(b"%PDF-1.4 report")
+    return {
+        "contentType": "application/pdf",
+        "size": path.stat().st_size,
+        "title": "BOA PDF Report",
+        "path": str(path),
+        "hash": file_sha1(path),
+        "creation": "2024-01-02T10:15:00.000+01:00",
+    }
+
+
+@pytest.mark.parametrize("allow_head", [True, False])
+def test_upload_sets_url(tmp_path: Path, allow_head: bool) -> None:
+    reports = [report(tmp_path)]
+    # Without HEAD, the uploader checks for existing Binaries with GET
+    with serve(StubConfig(allow_head=allow_head)) as server:
+        uploader = BinaryUploader(FHIRServer(server.url, "user", "pwd", timeout=5))
+        uploader.upload(reports)
+        assert (uploader.uploaded, uploader.skipped) == (1, 0)
+        assert reports[0]["url"] == f"Binary/{reports[0]['hash']}"
+
+        # Already on the server
+        reports = [report(tmp_path)]
+        uploader.upload(reports)
+        uploader.close()
+        assert (uploader.uploaded, uploader.skipped) == (1, 1)
+        assert reports[0]["url"] == f"Binary/{reports[0]['hash']}"
+        # HEAD is only tried once
+        assert server.stats.status_codes.get(405, 0) == (0 if allow_head else 1)
@@ -0,0 +1,111 @@
+import json
+import logging
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+import pytest
+from pydicom.dataset import Dataset, FileMetaDataset
+from pydicom.uid import UID, ExplicitVRLittleEndian, generate_uid
+
+from boa_guard import artifacts, bundles, store, tx
+from boa_guard.mapping_dict import mapping_dict
+
+
+def make_study(folder: Path, patient_id: str) -> None:
+    (folder / "dicoms").mkdir(parents=True)
+    ds = Dataset()
+    ds.file_meta = FileMetaDataset()
+    ds.file_meta.TransferSyntaxUID = ExplicitVRLittleEndian
+    ds.file_meta.MediaStorageSOPClassUID = UID("1.2.840.10008.5.1.4.1.1.2")
+    ds.file_meta.MediaStorageSOPInstanceUID = generate_uid()
+    ds.StudyInstanceUID = generate_uid()
+    ds.SeriesInstanceUID = generate_uid()
+    ds.PatientID = patient_id
+    ds.SeriesNumber = 1
+    ds.Modality = "CT"
+    ds.StudyDate = ds.AcquisitionDate = "20240102"
+    ds.StudyTime = ds.AcquisitionTime = "101112"
+    ds.is_little_endian = True
+    ds.is_implicit_VR = False
+    ds.save_as(folder / "dicoms" / "0.dcm", write_like_original=False)
+
+    region = {"min_slice_idx": 1, "max_slice_idx": 9}
+    measurements = {t: {"sum": 1.0} for t in mapping_dict["tissues"]}
+    aggregated = {
+        b: {
+            **region,
+            "measurements": measurements,
+            "measurements_no_extremities": measurements,
+        }
+        for b in mapping_dict["bca"]
+    }
+    (folder / "bca-measurements.json").write_text(
+        json.dumps({"slices": [[0.1] * 20] * 20, "aggregated": aggregated})
+    )
+    total = {"liver": {"present": True, "volume_ml": 1.0}}
+    (folder / "total-measurements.json").write_text(
+        json.dumps({"segmentations": {"total": total}})
+    )
+    pd.DataFrame(
+        [
+            ["BOAVersion", "1.0"],
+            ["BOAGitHash", "abc"],
+            ["PredictedContrastPhase", "NATIVE"],
+            ["PredictedContrastInGIT", "NO"],
+        ]
+    ).to_excel(folder / "output.xlsx", sheet_name="info", header=False, index=False)
+
+
+@pytest.fixture
+def boa_folder(tmp_path: Path) -> Path:
+    folder = tmp_path / "boa"
+    for patient_id in ("P1", "P2"):
+        make_study(folder / patient_id / "study", patient_id)
+    return folder
+
+
+def resource_ids(transaction: dict[str, Any]) -> set[str]:
+    return {e["request"]["url"] for e in transaction["entry"]}
+
+
+def test_distributed_run_replaces_bundles_file(
+    tmp_path: Path, boa_folder: Path
+) -> None:
+    fhir_folder = tmp_path / "fhir"
+    bundles.main(fhir_folder, boa_folder, compress="gzip")
+    assert (fhir_folder / "fhir-bundles.json.gz").is_file()
+
+    # The distributed run creates new resource ids for the same studies
+    bundles.main(fhir_folder, boa_folder, distributed=True, worker_id="w1")
+    assert artifacts.find_artifact(fhir_folder, "fhir-bundles.json") is None
+
+    tx.main(fhir_folder)
+    transaction = artifacts.read_json(fhir_folder / "transaction_bundles.json")
+    shards = store.select_bundles(fhir_folder)
+    assert shards is not None
+    shard_ids = {f"{k}/{v['id']}" for r in shards for k, v in r.items()}
+    assert resource_ids(transaction) == shard_ids
+
+
+@pytest.mark.parametrize(
+    ("options", "message"),
+    [
+        ({"rescan": True}, "only apply with --distributed"),
+        ({"requeue": ["failed"]}, "only apply with --distributed"),
+        (
+            {"distributed": True, "shards_only": True, "worker_id": "w1"},
+            "--shards-only is ignored",
+        ),
+    ],
+)
+def test_ignored_options_warn(
+    tmp_path: Path,
+    boa_folder: Path,
+    caplog: pytest.LogCaptureFixture,
+    options: dict[str, object],
+    message: str,
+) -> None:
+    with caplog.at_level(logging.WARNING, logger="boa-guard"):
+        bundles.main(tmp_path / "fhir", boa_folder, **options)
+    assert message in caplog.text
@@ -0,0 +1,58 @@
+import json
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from boa_guard.partial_json import load_subtree
+
+DOCUMENT = {
+    'a"x': {"aggregated": "wrong"},
+    "strings": ['}]\\"{', "\\", "[", "é\n"],
+    "nested": [[[{"a": [1, {"b": [[], {}]}]}]], {"c": {"d": {"e": [None]}}}],
+    "numbers": [1, -2.5e-3, True, False, None],
+    "empty": {},
+    "aggregated": {"abdominal_cavity": {"min_slice_idx": 1, "max_slice_idx": 9}},
+    "after": [1, 2],
+}
+
+
+def write(tmp_path: Path, document: Any, indent: int | None = None) -> Path:
+    path = tmp_path / "measurements.json"
+    path.write_text(json.dumps(document, indent=indent), encoding="utf-8")
+    return path
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+@pytest.mark.parametrize("key", list(DOCUMENT))
+def test_load_subtree(tmp_path: Path, indent: int | None, key: str) -> None:
+    path = write(tmp_path, DOCUMENT, indent)
+    assert load_subtree(path, key) == DOCUMENT[key]
+
+
+def test_load_subtree_nested_keys(tmp_path: Path) -> None:
+    path = write(tmp_path, DOCUMENT)
+    assert load_subtree(path, "aggregated", "abdominal_cavity", "max_slice_idx") == 9
+    assert load_subtree(path, 'a"x', "aggregated") == "wrong"
+
+
+def test_load_subtree_missing_key(tmp_path: Path) -> None:
+    path = write(tmp_path, DOCUMENT)
+    with pytest.raises(KeyError):
+        load_subtree(path, "missing")
+    with pytest.raises(KeyError):
+        load_subtree(path, "numbers", "aggregated")
+
+
+def test_load_subtree_empty_file(tmp_path: Path) -> None:
+    path = tmp_path / "measurements.json"
+    path.touch()
+    with pytest.raises(ValueError, match="empty"):
+        load_subtree(path, "aggregated")
+
+
+def test_load_subtree_truncated_file(tmp_path: Path) -> None:
+    path = tmp_path / "measurements.json"
+    path.write_text(json.dumps(DOCUMENT)[:100], encoding="utf-8")
+    with pytest.raises(ValueError):
+        load_subtree(path, "aggregated")
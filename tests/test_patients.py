@@ -0,0 +1,81 @@
+import json
+import logging
+from collections.abc import Callable
+from contextlib import AbstractContextManager
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from boa_guard import artifacts, patients, push
+from boa_guard.stub_server import StubConfig, StubFHIRServer, serve
+from boa_guard.utils import FHIRServer
+
+
+def test_find_missing_pages_and_caches(tmp_path: Path) -> None:
+    cache_db = tmp_path / patients.CACHE_NAME
+    ids = [f"P{i}" for i in range(7)]
+    # The server returns at most two patients per page
+    with serve(StubConfig(patients=ids[:5], page_size=2)) as server:
+        fhir = FHIRServer(server.url, "user", "pwd", timeout=5)
+        assert patients.find_missing(fhir, ids, cache_db) == {"P5", "P6"}
+        assert server.stats.requests == 3
+
+        # Found patients are cached, missing ones are looked up again
+        assert patients.find_missing(fhir, ids, cache_db) == {"P5", "P6"}
+        assert server.stats.requests == 4
+        assert patients.find_missing(fhir, ids, cache_db, ttl=0) == {"P5", "P6"}
+        assert server.stats.requests == 7
+
+
+def test_find_missing_batches(tmp_path: Path) -> None:
+    ids = [f"P{i}" for i in range(5)]
+    with serve(StubConfig(patients=ids)) as server:
+        fhir = FHIRServer(server.url, "user", "pwd", timeout=5)
+        missing = patients.find_missing(
+            fhir, ids, tmp_path / patients.CACHE_NAME, batch_size=2
+        )
+        assert missing == set()
+        assert server.stats.requests == 3
+
+
+def test_hold_back(make_transaction: Callable[..., dict[str, Any]]) -> None:
+    kept, held = patients.hold_back(make_transaction("P1", "P2", "P1"), {"P1"})
+    assert patients.patient_ids(kept) == {"P2"}
+    assert kept["type"] == "transaction"
+    assert [e["resource"]["id"] for e in held] == ["obs-P1", "obs-P1"]
+
+
+def test_hold_back_missing(
+    tmp_path: Path, make_transaction: Callable[..., dict[str, Any]]
+) -> None:
+    json_held = tmp_path / patients.HELD_BACK_NAME
+    with serve(StubConfig(patients=["P1"])) as server:
+        fhir = FHIRServer(server.url, "user", "pwd", timeout=5)
+        kept = patients.hold_back_missing(fhir, make_transaction("P1", "P2"), tmp_path)
+        assert patients.patient_ids(kept) == {"P1"}
+        held = json.loads(json_held.read_text())
+        assert held["missingPatients"] == ["P2"]
+        assert [e["resource"]["id"] for e in held["entry"]] == ["obs-P2"]
+
+        # Nothing held back anymore, the old file is removed
+        kept = patients.hold_back_missing(fhir, make_transaction("P1"), tmp_path)
+        assert patients.patient_ids(kept) == {"P1"}
+        assert not json_held.exists()
+
+
+def test_push_check_patients(
+    tmp_path: Path,
+    make_transaction: Callable[..., dict[str, Any]],
+    serve_env: Callable[..., AbstractContextManager[StubFHIRServer]],
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    json_tx = artifacts.artifact_path(tmp_path, "transaction_bundles.json", "gzip")
+    artifacts.write_json(json_tx, make_transaction("P1", "P2"))
+    with serve_env(StubConfig(patients=["P1"])) as server:
+        with caplog.at_level(logging.WARNING, logger="boa-guard"):
+            push.main(tmp_path, check_patients=True, forward_compressed=True)
+        assert "Observation/obs-P1" in server.resources
+        assert "Observation/obs-P2" not in server.resources
+    assert "--forward-compressed is ignored" in caplog.text
+    assert (tmp_path / patients.HELD_BACK_NAME).is_file()
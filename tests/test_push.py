@@ -0,0 +1,92 @@
+import json
+from collections.abc import Callable
+from contextlib import AbstractContextManager
+from pathlib import Path
+from typing import Any
+
+import pytest
+import requests
+
+from boa_guard import artifacts, push
+from boa_guard.push import post_data, post_transactions
+from boa_guard.stub_server import StubConfig, StubFHIRServer, serve
+from boa_guard.utils import FHIRServer
+
+
+def encode(transaction: dict[str, Any]) -> bytes:
+    return json.dumps(transaction).encode("utf-8")
+
+
+def test_post_data(
+    tmp_path: Path, make_transaction: Callable[..., dict[str, Any]]
+) -> None:
+    json_logs = tmp_path / "response.json"
+    with serve() as server:
+        fhir = FHIRServer(server.url, "user", "pwd", timeout=5)
+        response = post_data(fhir, encode(make_transaction("P1", "P2")), json_logs)
+        assert set(server.resources) == {"Observation/obs-P1", "Observation/obs-P2"}
+    assert response["type"] == "transaction-response"
+    assert [e["response"]["status"] for e in response["entry"]] == ["201 Created"] * 2
+    assert json.loads(json_logs.read_text()) == response
+
+
+@pytest.mark.parametrize(
+    ("config", "status"),
+    [
+        (StubConfig(rate_limit_rate=1.0), 429),
+        (StubConfig(unavailable_rate=1.0), 503),
+        (StubConfig(entry_failure_rate=1.0), 422),
+    ],
+)
+def test_post_data_errors(
+    tmp_path: Path,
+    make_transaction: Callable[..., dict[str, Any]],
+    config: StubConfig,
+    status: int,
+) -> None:
+    json_logs = tmp_path / "response.json"
+    with serve(config) as server:
+        fhir = FHIRServer(server.url, "user", "pwd", timeout=5)
+        with pytest.raises(requests.HTTPError) as exc_info:
+            post_data(fhir, encode(make_transaction("P1")), json_logs)
+        # Transactions are all or nothing
+        assert server.resources == {}
+    assert exc_info.value.response.status_code == status
+    # The OperationOutcome is kept for inspection
+    assert json.loads(json_logs.read_text())["resourceType"] == "OperationOutcome"
+
+
+@pytest.mark.parametrize(
+    ("compression", "forward_compressed"),
+    [(None, False), ("gzip", False), ("gzip", True), ("zstd", False)],
+)
+def test_post_transactions(
+    tmp_path: Path,
+    make_transaction: Callable[..., dict[str, Any]],
+    compression: str | None,
+    forward_compressed: bool,
+) -> None:
+    if compression == "zstd":
+        pytest.importorskip("zstandard")
+    json_tx = artifacts.artifact_path(tmp_path, "transaction_bundles.json", compression)
+    artifacts.write_json(json_tx, make_transaction("P1"))
+    with serve() as server:
+        fhir = FHIRServer(server.url, "user", "pwd", timeout=5)
+        post_transactions(fhir, json_tx, tmp_path / "response.json", forward_compressed)
+        assert set(server.resources) == {"Observation/obs-P1"}
+        received = server.stats.bytes_received
+    if forward_compressed:
+        assert received == json_tx.stat().st_size
+
+
+def test_main(
+    tmp_path: Path,
+    make_transaction: Callable[..., dict[str, Any]],
+    serve_env: Callable[..., AbstractContextManager[StubFHIRServer]],
+) -> None:
+    json_tx = tmp_path / "transaction_bundles.json"
+    artifacts.write_json(json_tx, make_transaction("P1"))
+    with serve_env() as server:
+        push.main(tmp_path, timeout=5)
+        assert set(server.resources) == {"Observation/obs-P1"}
+    assert (tmp_path / "response.json").is_file()
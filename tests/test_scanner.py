@@ -0,0 +1,43 @@
+from pathlib import Path
+
+from boa_guard.scanner import iter_excel_files
+
+
+def make_tree(root: Path) -> None:
+    for folder, names in {
+        "p1/s1": ["output.xlsx", "~$output.xlsx", "report.pdf"],
+        "p1/s1/dicoms": ["hidden.xlsx"],
+        "p2/s1": ["output.xlsx"],
+        "p2/s1/previews/old": ["output.xlsx"],
+        "p3": ["$temp.xlsx"],
+    }.items():
+        (root / folder).mkdir(parents=True, exist_ok=True)
+        for name in names:
+            (root / folder / name).touch()
+
+
+def test_iter_excel_files(tmp_path: Path) -> None:
+    make_tree(tmp_path)
+    assert sorted(iter_excel_files(tmp_path, max_workers=2)) == [
+        tmp_path / "p1/s1/output.xlsx",
+        tmp_path / "p2/s1/output.xlsx",
+        tmp_path / "p2/s1/previews/old/output.xlsx",
+    ]
+
+
+def test_iter_excel_files_skip_dirs(tmp_path: Path) -> None:
+    make_tree(tmp_path)
+    # `dicoms` is still skipped
+    assert sorted(iter_excel_files(tmp_path, ["previews"])) == [
+        tmp_path / "p1/s1/output.xlsx",
+        tmp_path / "p2/s1/output.xlsx",
+    ]
+
+
+def test_iter_excel_files_early_stop(tmp_path: Path) -> None:
+    for i in range(50):
+        (tmp_path / str(i)).mkdir()
+        (tmp_path / str(i) / "output.xlsx").touch()
+    files = iter_excel_files(tmp_path, max_workers=2)
+    assert next(files).name == "output.xlsx"
+    files.close()
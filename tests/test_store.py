@@ -0,0 +1,70 @@
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from boa_guard import artifacts, store
+
+
+def study(patient_id: str, series_uid: str) -> list[dict[str, Any]]:
+    return [
+        {
+            "ImagingStudy": {
+                "identifier": [
+                    {"system": "urn:dicom:uid", "value": "urn:oid:1.2.3"},
+                ],
+                "series": [{"uid": series_uid}],
+                "subject": {"reference": f"Patient/{patient_id}"},
+            }
+        },
+        {
+            "Observation": {
+                "subject": {"reference": f"Patient/{patient_id}"},
+                "derivedFrom": f"image-{series_uid}",
+            }
+        },
+    ]
+
+
+@pytest.mark.parametrize("compression", [None, "gzip", "zstd"])
+def test_write_studies(tmp_path: Path, compression: str | None) -> None:
+    if compression == "zstd":
+        pytest.importorskip("zstandard")
+    bundles = [study("P1", "1.2.3.4"), study("P2", "1.2.3.5")]
+    assert store.write_studies(tmp_path, bundles, compression) == 2
+
+    rows = store.query_studies(tmp_path, patient_ids=["P2"])
+    assert [r["series_uid"] for r in rows] == ["1.2.3.5"]
+    shard = store.store_folder(tmp_path) / rows[0]["path"]
+    assert artifacts.detect_compression(shard) == compression
+    assert store.load_studies(tmp_path, rows) == bundles[1]
+    assert store.select_bundles(tmp_path) == bundles[0] + bundles[1]
+
+
+def test_write_studies_replaces_other_compression(tmp_path: Path) -> None:
+    store.write_studies(tmp_path, [study("P1", "1.2.3.4")])
+    store.write_studies(tmp_path, [study("P1", "1.2.3.4")], "gzip")
+    shards = sorted(p.name for p in store.store_folder(tmp_path).glob("*.json*"))
+    assert len(shards) == 1
+    assert shards[0].endswith(".json.gz")
+    assert store.select_bundles(tmp_path) == study("P1", "1.2.3.4")
+
+
+def test_load_studies_hash_mismatch(tmp_path: Path) -> None:
+    store.write_studies(tmp_path, [study("P1", "1.2.3.4")], "gzip")
+    rows = store.query_studies(tmp_path)
+    artifacts.write_json(store.store_folder(tmp_path) / rows[0]["path"], [])
+    with pytest.raises(ValueError, match="does not match its hash"):
+        store.load_studies(tmp_path, rows)
+
+
+def test_write_studies_image_id(tmp_path: Path) -> None:
+    # The ImageID comes from the Observations, also without a SeriesInstanceUID
+    store.write_studies(tmp_path, [study("P1", "None")])
+    rows = store.query_studies(tmp_path)
+    assert [(r["image_id"], r["path"]) for r in rows] == [
+        ("image-None", "image-None.json")
+    ]
+
+    bundle = study("P2", "1.2.3.4")[:1]
+    assert store.write_studies(tmp_path, [bundle]) == 0
@@ -0,0 +1,158 @@
+import threading
+import time
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from boa_guard import workqueue
+
+
+@pytest.fixture
+def db(tmp_path: Path) -> Path:
+    return tmp_path / workqueue.QUEUE_NAME
+
+
+@pytest.fixture(autouse=True)
+def fast_polling(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(workqueue, "POLL_SECONDS", 0.01)
+
+
+def test_claim_and_finish(db: Path) -> None:
+    assert workqueue.enqueue(db, [Path("a.xlsx"), Path("b.xlsx")]) == 2
+    assert workqueue.enqueue(db, [Path("a.xlsx")]) == 0
+    first = workqueue.claim(db, "w1", 60)
+    second = workqueue.claim(db, "w2", 60)
+    assert {first, second} == {Path("a.xlsx"), Path("b.xlsx")}
+    assert workqueue.claim(db, "w3", 60) is None
+    assert first is not None and second is not None
+    assert workqueue.finish(db, first, "w1")
+    # Only the owner can finish a folder
+    assert not workqueue.finish(db, second, "w1")
+    assert workqueue.finish(db, second, "w2", "Broken")
+    assert workqueue.counts(db) == {"done": 1, "failed": 1}
+
+
+def test_expired_lease_is_reclaimed(db: Path) -> None:
+    workqueue.enqueue(db, [Path("a.xlsx")])
+    assert workqueue.claim(db, "dead", 0.05) == Path("a.xlsx")
+    assert workqueue.claim(db, "w2", 60) is None
+    time.sleep(0.1)
+    assert workqueue.claim(db, "w2", 60) == Path("a.xlsx")
+    # The dead worker lost its lease and can't finish the folder anymore
+    assert not workqueue.heartbeat(db, Path("a.xlsx"), "dead", 60)
+    assert not workqueue.finish(db, Path("a.xlsx"), "dead")
+    assert workqueue.finish(db, Path("a.xlsx"), "w2")
+    assert workqueue.counts(db) == {"done": 1}
+
+
+def test_expired_too_often_fails(db: Path) -> None:
+    workqueue.enqueue(db, [Path("a.xlsx")])
+    for _ in range(3):
+        assert workqueue.claim(db, "dead", 0.01, max_attempts=3) == Path("a.xlsx")
+        time.sleep(0.05)
+    assert workqueue.claim(db, "w2", 60, max_attempts=3) is None
+    assert workqueue.counts(db) == {"failed": 1}
+
+
+def test_heartbeat_keeps_lease(db: Path) -> None:
+    workqueue.enqueue(db, [Path("a.xlsx")])
+
+    def process(excel: Path) -> None:
+        time.sleep(0.3)
+        # The lease was renewed while processing
+        assert workqueue.claim(db, "w2", 0.15) is None
+
+    workqueue.run_worker(db, "w1", process, lambda: [Path("a.xlsx")], 0.15)
+    assert workqueue.counts(db) == {"done": 1}
+
+
+def test_exceptions_mark_folder_failed(db: Path) -> None:
+    def process(excel: Path) -> str | None:
+        if excel.name == "a.xlsx":
+            raise KeyError("aggregated")
+        return "Not a BOA folder" if excel.name == "b.xlsx" else None
+
+    scan = [Path("a.xlsx"), Path("b.xlsx"), Path("c.xlsx")]
+    assert workqueue.run_worker(db, "w1", process, lambda: scan, 60) == 3
+    assert workqueue.counts(db) == {"done": 1, "failed": 2}
+
+
+def test_single_scan(db: Path) -> None:
+    started = threading.Event()
+    release = threading.Event()
+    scans: list[str] = []
+    processed: list[Path] = []
+
+    def scan() -> Iterator[Path]:
+        scans.append(threading.current_thread().name)
+        started.set()
+        yield Path("a.xlsx")
+        release.wait(5)
+        yield Path("b.xlsx")
+
+    workers = [
+        threading.Thread(
+            target=workqueue.run_worker,
+            args=(db, f"w{i}", processed.append, scan, 60),
+        )
+        for i in range(3)
+    ]
+    workers[0].start()
+    assert started.wait(5)
+    for worker in workers[1:]:
+        worker.start()
+    # Workers wait for the running scan instead of stopping early
+    time.sleep(0.2)
+    assert all(worker.is_alive() for worker in workers)
+    release.set()
+    for worker in workers:
+        worker.join(5)
+    assert len(scans) == 1
+    assert sorted(processed) == [Path("a.xlsx"), Path("b.xlsx")]
+    assert workqueue.scan_done(db)
+
+
+def test_expired_scan_is_taken_over(db: Path) -> None:
+    assert workqueue.claim_scan(db, "dead", 0.05)
+    assert not workqueue.claim_scan(db, "w2", 60)
+    time.sleep(0.1)
+    processed: list[Path] = []
+    workqueue.run_worker(db, "w2", processed.append, lambda: [Path("a.xlsx")], 60)
+    assert processed == [Path("a.xlsx")]
+    assert workqueue.scan_done(db)
+
+
+def test_failed_scan_is_retried(db: Path) -> None:
+    attempts: list[int] = []
+
+    def scan() -> Iterator[Path]:
+        attempts.append(1)
+        yield Path("a.xlsx")
+        if len(attempts) == 1:
+            raise OSError("Stale file handle")
+        yield Path("b.xlsx")
+
+    processed: list[Path] = []
+    workqueue.run_worker(db, "w1", processed.append, scan, 0.05)
+    assert len(attempts) == 2
+    assert sorted(processed) == [Path("a.xlsx"), Path("b.xlsx")]
+
+
+def test_reset(db: Path) -> None:
+    workqueue.run_worker(db, "w1", lambda excel: "Broken", lambda: [Path("a.xlsx")], 60)
+    assert workqueue.counts(db) == {"failed": 1}
+    processed: list[Path] = []
+    scan = [Path("a.xlsx"), Path("b.xlsx")]
+    # Without a reset the queue is finished
+    workqueue.run_worker(db, "w1", processed.append, lambda: scan, 60)
+    assert processed == []
+
+    assert workqueue.reset(db, rescan=True) == 0
+    workqueue.run_worker(db, "w1", processed.append, lambda: scan, 60)
+    assert processed == [Path("b.xlsx")]
+
+    assert workqueue.reset(db, requeue=["failed"]) == 1
+    workqueue.run_worker(db, "w1", processed.append, lambda: scan, 60)
+    assert processed == [Path("b.xlsx"), Path("a.xlsx")]
+    assert workqueue.counts(db) == {"done": 2}